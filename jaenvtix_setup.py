@@ -21,10 +21,13 @@ Este script implementa um fluxo idempotente e detalhadamente documentado (por lo
          mvn-custom/
            bin/
              mvn[.cmd|.sh]
-             mvnd[.exe]
+           mvnd/
+             bin/
+               mvnd[.exe]
            ...
-5) Baixar e extrair JDK (com retry e backoff simples, fallback de mirrors).
+5) Baixar e extrair JDK (com retry e backoff exponencial com jitter, fallback de mirrors).
 6) Baixar e extrair Maven (com retry e backoff, fallback de mirrors) e apontá-lo para o JDK instalado.
+   - mvnd (Maven Daemon) opcional em mvn-custom/mvnd, fixado no mesmo JDK via mvnd.properties.
 7) Atualizar ~/.m2/toolchains.xml e ~/.m2/settings.xml de forma segura e idempotente.
 8) Em workspaces com múltiplos projetos, tratar cada projeto independentemente, incluindo .vscode/settings.json para cada um.
 9) Limpar a pasta temporária ~/.jaenvtix/temp ao final (ou reportar resíduos se houver falhas).
@@ -44,18 +47,37 @@ Requisitos:
 """
 from __future__ import annotations
 
+import argparse
+import atexit
+import codecs
+import errno
+import functools
+import hashlib
+import io
 import json
+import os
 import platform
+import random
 import re
 import shutil
+import subprocess
 import sys
 import tarfile
+import tempfile
+import threading
 import time
+import urllib.error
+import urllib.parse
 import zipfile
 from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+if TYPE_CHECKING:
+    # Pilha de rede (http.client/ssl/urllib.request) só é importada no primeiro download:
+    # execuções mornas e workspaces sem pom.xml não pagam esse custo de inicialização
+    import http.client
 
 try:
     # xml.etree is sufficient here and avoids extra deps
@@ -74,10 +96,57 @@ CONFIG_DIR = SCRIPT_DIR / "config"
 HOME = Path.home()
 JAENVTIX_HOME = HOME / ".jaenvtix"
 TEMP_DIR = JAENVTIX_HOME / "temp"
+# Arquivos baixados (Maven, JDKs .zip) preservados entre execuções; cleanup_temp não toca aqui
+CACHE_DIR = JAENVTIX_HOME / "cache"
+STATE_FILE = JAENVTIX_HOME / "state.json"
+# Sentinela gravada após uma instalação completa (URL de origem + sha256)
+INSTALLED_MARKER = ".jaenvtix.installed"
+# Gravada antes de extrair o JDK e removida após a sentinela: marca árvores incompletas
+INSTALLING_MARKER = ".jaenvtix.installing"
 M2_DIR = HOME / ".m2"
 
 # Maven versão default
 DEFAULT_MAVEN_VERSION = "3.9.11"
+# Maven Daemon (JVM aquecida entre builds); False mantém o VS Code apontando para o mvn comum
+PREFER_MVND = True
+DEFAULT_MVND_VERSION = "1.0.2"
+# Maven Build Cache Extension em .mvn/ de cada projeto (reaproveita saídas de goals entre builds)
+ENABLE_BUILD_CACHE = True
+BUILD_CACHE_EXTENSION_VERSION = "1.2.0"
+BUILD_CACHE_OPTIONS = ("-Dmaven.build.cache.enabled=true", "-Dmaven.build.cache.lazyRestore=true")
+
+# Tamanho do buffer de leitura ao extrair direto do stream HTTP
+STREAM_BUFFER_SIZE = 256 * 1024
+# Blocos de cópia dos downloads em arquivo (1 MB: ~64x menos syscalls que o padrão de 16 KB)
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+# Buffer do arquivo .zip quando extraído pelo zipfile (milhares de entradas pequenas)
+ZIP_READ_BUFFER = 1024 * 1024
+# .zip grandes (JDK do Windows) são extraídos por várias threads: o zlib libera o GIL
+# ao descompactar e a escrita em disco se sobrepõe; uma thread por núcleo, até 8
+ZIP_EXTRACT_WORKERS = max(2, min(8, os.cpu_count() or 1))
+PARALLEL_EXTRACT_MIN_SIZE = 10 * 1024 * 1024
+# Downloads em arquivo acima deste tamanho usam várias conexões com Range (ex.: JDK .zip)
+PARALLEL_DOWNLOAD_MIN_SIZE = 32 * 1024 * 1024
+PARALLEL_DOWNLOAD_PARTS = 4
+PARALLEL_PART_ATTEMPTS = 3
+# Trechos do início/fim comparados quando o servidor não envia ETag nem Last-Modified
+EDGE_PROBE_SIZE = 64 * 1024
+
+# Timeouts (s) de socket: 1ª passada rápida por mirror e tentativas com backoff
+FAST_FAIL_TIMEOUT = 15
+# Timeout (s) da sondagem paralela dos mirrors antes do download
+PROBE_TIMEOUT = 5
+DOWNLOAD_TIMEOUT = 60
+# Espera máxima (s) entre tentativas de download, inclusive quando o servidor pede Retry-After
+RETRY_BACKOFF_CAP = 30.0
+# Redirecionamentos seguidos por download (corretto/adoptium redirecionam para o CDN)
+MAX_REDIRECTS = 5
+
+# Limite de projetos processados em paralelo (JDK/Maven são instalados uma vez por versão)
+MAX_PROVISION_WORKERS = 8
+
+# Serializa escritas em arquivos compartilhados entre projetos (~/.m2)
+_SHARED_FILES_LOCK = threading.Lock()
 
 # Mapeamento de preferências de distribuição por versão LTS.
 # Manter aqui os links base por SO/arch e versão de Java. Fallbacks na ordem.
@@ -102,6 +171,9 @@ class ProjectContext:
     jdk_home: Optional[Path] = None
     maven_home: Optional[Path] = None
     maven_bin: Optional[Path] = None
+    mvnd_bin: Optional[Path] = None
+    # Módulo de outro projeto descoberto: a extensão do Build Cache fica no .mvn/ do pai
+    is_module: bool = False
 
 
 class ValidationStep:
@@ -116,8 +188,8 @@ class ValidationStep:
 class ValidationChain:
     """Chain-of-responsibility runner to keep the pipeline linear and simple."""
 
-    def __init__(self, steps: List[ValidationStep]):
-        self.steps = steps
+    def __init__(self, steps: Sequence[ValidationStep]):
+        self.steps = tuple(steps)
 
     def run(self, ctx: ProjectContext) -> bool:
         for step in self.steps:
@@ -128,17 +200,23 @@ class ValidationChain:
         return True
 
 
+# Fragmentos de URL por SO/arch de cada provedor (tabelas fixas, montadas uma vez)
+_ORACLE_FRAGMENTS: Dict[Tuple[str, str], Tuple[str, str]] = {
+    ("windows", "x86_64"): ("windows-x64", "zip"),
+    ("linux", "x86_64"): ("linux-x64", "tar.gz"),
+    ("linux", "aarch64"): ("linux-aarch64", "tar.gz"),
+    ("macos", "x86_64"): ("macos-x64", "tar.gz"),
+    ("macos", "aarch64"): ("macos-aarch64", "tar.gz"),
+}
+_TEMURIN_OS_FRAGMENTS = {"windows": "windows", "linux": "linux", "macos": "mac"}
+_CORRETTO_OS_FRAGMENTS = {"windows": "windows", "linux": "linux", "macos": "macos"}
+_ARCH_FRAGMENTS = {"x86_64": "x64", "aarch64": "aarch64"}
+
+
 def oracle_latest_url(java_version: str, os_name: str, arch: str) -> Optional[Tuple[str, str]]:
     """Return the Oracle "latest" artifact URL for the requested major/OS/arch."""
 
-    fragments: Dict[Tuple[str, str], Tuple[str, str]] = {
-        ("windows", "x86_64"): ("windows-x64", "zip"),
-        ("linux", "x86_64"): ("linux-x64", "tar.gz"),
-        ("linux", "aarch64"): ("linux-aarch64", "tar.gz"),
-        ("macos", "x86_64"): ("macos-x64", "tar.gz"),
-        ("macos", "aarch64"): ("macos-aarch64", "tar.gz"),
-    }
-    fragment = fragments.get((os_name, arch))
+    fragment = _ORACLE_FRAGMENTS.get((os_name, arch))
     if not fragment:
         return None
     platform_fragment, ext = fragment
@@ -162,15 +240,8 @@ def oracle_latest_dist(java_version: str, os_name: str, arch: str) -> JdkDist:
 def temurin_latest_url(java_version: str, os_name: str, arch: str) -> Optional[Tuple[str, str]]:
     """Return the Temurin API endpoint that redirects to the latest GA build."""
 
-    os_fragment = {
-        "windows": "windows",
-        "linux": "linux",
-        "macos": "mac",
-    }.get(os_name)
-    arch_fragment = {
-        "x86_64": "x64",
-        "aarch64": "aarch64",
-    }.get(arch)
+    os_fragment = _TEMURIN_OS_FRAGMENTS.get(os_name)
+    arch_fragment = _ARCH_FRAGMENTS.get(arch)
     if not os_fragment or not arch_fragment:
         return None
     ext = "zip" if os_name == "windows" else "tar.gz"
@@ -194,15 +265,8 @@ def temurin_latest_dist(java_version: str, os_name: str, arch: str) -> JdkDist:
 def corretto_latest_url(java_version: str, os_name: str, arch: str) -> Optional[Tuple[str, str]]:
     """Return the Amazon Corretto evergreen download URL for the requested combo."""
 
-    os_fragment = {
-        "windows": "windows",
-        "linux": "linux",
-        "macos": "macos",
-    }.get(os_name)
-    arch_fragment = {
-        "x86_64": "x64",
-        "aarch64": "aarch64",
-    }.get(arch)
+    os_fragment = _CORRETTO_OS_FRAGMENTS.get(os_name)
+    arch_fragment = _ARCH_FRAGMENTS.get(arch)
     if not os_fragment or not arch_fragment:
         return None
     ext = "zip" if os_name == "windows" else "tar.gz"
@@ -230,37 +294,31 @@ DIST_BUILDERS = {
 }
 
 
-def load_jdk_urls(config_path: Path) -> Dict[str, Dict[Tuple[str, str], List[JdkDist]]]:
-    """Load JDK URL mappings from a JSON file."""
+def load_jdk_urls(config_path: Path) -> Dict[str, Dict[str, List[str]]]:
+    """Load the JDK provider table (version -> ``os|arch`` -> provider keys) from JSON."""
 
     if not config_path.exists():
         raise FileNotFoundError(f"Missing JDK URL configuration: {config_path}")
 
     with config_path.open("r", encoding="utf-8") as handle:
-        data = json.load(handle)
+        data: Dict[str, Dict[str, List[str]]] = json.load(handle)
+    return data
 
-    mapping: Dict[str, Dict[Tuple[str, str], List[JdkDist]]] = {}
-    for java_version, combos in data.items():
-        mapping[java_version] = {}
-        for combo_key, dist_names in combos.items():
-            try:
-                os_name, arch = combo_key.split("|", 1)
-            except ValueError:
-                log(f"[WARN] Invalid os|arch key in JDK config: {combo_key}")
-                continue
-            dists: List[JdkDist] = []
-            for dist_name in dist_names:
-                builder = DIST_BUILDERS.get(dist_name)
-                if not builder:
-                    log(f"[WARN] Unknown JDK distribution key: {dist_name}")
-                    continue
-                try:
-                    dists.append(builder(java_version, os_name, arch))
-                except Exception as exc:  # noqa: BLE001
-                    log(f"[WARN] Failed to build JDK distribution {dist_name} for {combo_key}: {exc}")
-            if dists:
-                mapping[java_version][(os_name, arch)] = dists
-    return mapping
+
+def get_jdk_dists(java_version: str, os_name: str, arch: str) -> List[JdkDist]:
+    """Build the configured JDK distributions for a single version/OS/arch on demand."""
+
+    dists: List[JdkDist] = []
+    for dist_name in JDK_PROVIDERS.get(java_version, {}).get(f"{os_name}|{arch}", []):
+        builder = DIST_BUILDERS.get(dist_name)
+        if not builder:
+            log(f"[WARN] Unknown JDK distribution key: {dist_name}")
+            continue
+        try:
+            dists.append(builder(java_version, os_name, arch))
+        except Exception as exc:  # noqa: BLE001
+            log(f"[WARN] Failed to build JDK distribution {dist_name} for {os_name}|{arch}: {exc}")
+    return dists
 
 
 def load_maven_urls(config_path: Path) -> Dict[str, Dict[str, str]]:
@@ -274,22 +332,48 @@ def load_maven_urls(config_path: Path) -> Dict[str, Dict[str, str]]:
     return data
 
 
-JDK_URLS = load_jdk_urls(CONFIG_DIR / "jdk_urls.json")
+# Só a tabela de provedores é carregada no import; os JdkDist são montados sob demanda
+JDK_PROVIDERS = load_jdk_urls(CONFIG_DIR / "jdk_urls.json")
 MAVEN_URLS = load_maven_urls(CONFIG_DIR / "maven_urls.json")
+# Mesmo formato, com chaves os|arch: o mvnd tem cliente nativo por plataforma
+MVND_URLS = load_maven_urls(CONFIG_DIR / "mvnd_urls.json")
 
 
 # ==========================
 # Utilidades
 # ==========================
 
+# Prefixo por thread: com projetos em paralelo, cada linha diz de qual projeto veio
+_LOG_CONTEXT = threading.local()
+
+
 def log(msg: str) -> None:
     """Print messages and force an immediate flush to stdout."""
 
-    print(msg, flush=True)
+    prefix = getattr(_LOG_CONTEXT, "prefix", "")
+    # Uma única escrita por linha evita mensagens intercaladas entre threads
+    print(f"{prefix}{msg}\n", end="", flush=True)
+
 
+def _keep_log_prefix(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap ``fn`` so it logs with the caller's project prefix when run in a worker thread."""
+
+    prefix = getattr(_LOG_CONTEXT, "prefix", "")
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any) -> Any:
+        _LOG_CONTEXT.prefix = prefix
+        try:
+            return fn(*args)
+        finally:
+            _LOG_CONTEXT.prefix = ""
 
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
 def detect_os_arch() -> Tuple[str, str]:
-    """Detect and normalize the current operating system and architecture."""
+    """Detect and normalize the current operating system and architecture (once per run)."""
 
     sys_os = platform.system().lower()
     if sys_os.startswith("win"):
@@ -314,15 +398,29 @@ def detect_os_arch() -> Tuple[str, str]:
     return os_name, arch
 
 
+# Pastas fixas (home, cache, jdk-<v>, ~/.m2) já criadas nesta execução; nunca são removidas
+_CREATED_DIRS: Set[Path] = set()
+
+
+def _ensure_dir(path: Path) -> Path:
+    """Create ``path`` (with parents) once per run; later calls skip the syscalls."""
+
+    if path not in _CREATED_DIRS:
+        path.mkdir(parents=True, exist_ok=True)
+        _CREATED_DIRS.add(path)
+    return path
+
+
 def ensure_dirs() -> None:
     """Create the ~/.jaenvtix directory structure required for downloads."""
 
     # 4) Estrutura de diretórios
     try:
-        (JAENVTIX_HOME).mkdir(parents=True, exist_ok=True)
-        (TEMP_DIR).mkdir(parents=True, exist_ok=True)
+        _ensure_dir(JAENVTIX_HOME)
+        _ensure_dir(TEMP_DIR)
+        _ensure_dir(CACHE_DIR)
         for v in ("8", "11", "17", "21", "25"):
-            (JAENVTIX_HOME / f"jdk-{v}").mkdir(parents=True, exist_ok=True)
+            _ensure_dir(_jdk_base(v))
         log(f"[OK] Estrutura base criada/validada em: {JAENVTIX_HOME}")
     except Exception as e:
         log(f"[ERRO] Falha ao criar estrutura em {JAENVTIX_HOME}: {e}")
@@ -330,6 +428,10 @@ def ensure_dirs() -> None:
         raise
 
 
+# Pastas de ferramentas/saída que nunca são projetos Maven (além das ocultas: .git, .idea...)
+_SKIPPED_SCAN_DIRS = frozenset({"node_modules", "target"})
+
+
 def find_projects_with_pom(root: Path) -> List[Path]:
     """Return root and first-level directories that contain a pom.xml."""
 
@@ -338,132 +440,309 @@ def find_projects_with_pom(root: Path) -> List[Path]:
     # verificar raiz
     if (root / "pom.xml").exists():
         projects.append(root)
-    # varrer subpastas de 1º nível
-    for child in root.iterdir():
-        if child.is_dir():
-            pom = child / "pom.xml"
-            if pom.exists():
-                projects.append(child)
+    # varrer subpastas de 1º nível (scandir reaproveita o tipo da entrada, sem stat extra)
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.name.startswith(".") or entry.name in _SKIPPED_SCAN_DIRS:
+                continue
+            if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "pom.xml")):
+                projects.append(Path(entry.path))
     return projects
 
 
+def write_text_if_changed(path: Path, text: str, encoding: str = "utf-8", errors: str = "strict") -> bool:
+    """Atomically write ``text`` to ``path`` unless it already has those exact bytes.
+
+    Returns ``True`` when the file was (re)written.
+    """
+
+    new_bytes = text.encode(encoding, errors)
+    try:
+        if path.read_bytes() == new_bytes:
+            return False
+    except FileNotFoundError:
+        pass
+    # Arquivo temporário no mesmo diretório: os.replace é atômico e nunca expõe escrita parcial
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(new_bytes)
+            # Dados no disco antes do rename: uma queda de energia não deixa o arquivo vazio
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def _single_flight(fn: Any) -> Any:
+    """Memoize ``fn`` per arguments; concurrent calls with the same arguments share one run.
+
+    Exceptions are not cached: callers waiting on a failed run get the error,
+    and the next call runs ``fn`` again.
+    """
+
+    results: Dict[Tuple[Any, ...], "Future[Any]"] = {}
+    lock = threading.Lock()
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any) -> Any:
+        with lock:
+            future = results.get(args)
+            owner = future is None
+            if owner:
+                future = results[args] = Future()
+        assert future is not None
+        if owner:
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                with lock:
+                    results.pop(args, None)
+                future.set_exception(e)
+        return future.result()
+
+    return wrapper
+
+
 # ==========================
-# POM Parsing
+# Estado persistente (cache entre execuções)
 # ==========================
 
-def ns_cleanup(tag: str) -> str:
-    """Strip the ``{namespace}`` prefix used by ElementTree."""
+_STATE: Optional[Dict[str, Dict[str, Any]]] = None
+_STATE_DIRTY = False
+_STATE_LOCK = threading.Lock()
 
-    # remove namespace {..}tag
-    if tag.startswith("{"):
-        return tag.split("}", 1)[1]
-    return tag
 
+def _state_section(name: str) -> Dict[str, Any]:
+    """Return a section of ~/.jaenvtix/state.json, loading the file on first use."""
 
-def find_first_text(elem: Optional[ET.Element], path_parts: List[str]) -> Optional[str]:
-    """Traverse a simple path ignoring namespaces and return the found text."""
+    global _STATE
+    with _STATE_LOCK:
+        if _STATE is None:
+            try:
+                data = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+                _STATE = data if isinstance(data, dict) else {}
+            except FileNotFoundError:
+                _STATE = {}
+            except Exception as e:
+                log(f"[WARN] Cache {STATE_FILE} inválido; será recriado: {e}")
+                _STATE = {}
+            poms = _STATE.get("poms")
+            if isinstance(poms, dict):
+                # pom.xml apagados/movidos nunca mais seriam consultados: não deixar o cache crescer
+                stale = [k for k in poms if not os.path.isfile(k)]
+                for key in stale:
+                    del poms[key]
+                if stale:
+                    _mark_state_dirty()
+            atexit.register(save_state)
+        section = _STATE.get(name)
+        if not isinstance(section, dict):
+            section = _STATE[name] = {}
+        return section
+
+
+def _mark_state_dirty() -> None:
+    global _STATE_DIRTY
+    _STATE_DIRTY = True
+
+
+def save_state() -> None:
+    """Persist the in-memory cache to ~/.jaenvtix/state.json when it changed."""
+
+    global _STATE_DIRTY
+    with _STATE_LOCK:
+        if _STATE is None or not _STATE_DIRTY:
+            return
+        try:
+            STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp = STATE_FILE.with_name(STATE_FILE.name + ".tmp")
+            tmp.write_text(json.dumps(_STATE, indent=2, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(STATE_FILE)
+            _STATE_DIRTY = False
+        except Exception as e:
+            log(f"[WARN] Falha ao salvar cache {STATE_FILE}: {e}")
 
-    # Busca descendente por caminho simples, ignorando namespaces
-    if elem is None:
-        return None
-    cur = elem
-    for part in path_parts:
-        found = None
-        for ch in cur:
-            if ns_cleanup(ch.tag) == part:
-                found = ch
-                break
-        if found is None:
-            return None
-        cur = found
-    return (cur.text or "").strip() if cur is not None else None
 
+def _sha256_file(path: Path, hexdigest: bool = True) -> Any:
+    """Hash a file (``hashlib.file_digest`` when available); ``hexdigest=False`` returns the hash object."""
 
-def parse_java_version_from_pom(pom_path: Path) -> Optional[str]:
-    """Extract the target Java version from a pom.xml using common heuristics."""
+    with path.open("rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: laço em C, sem passar cada bloco pelo interpretador
+            h = hashlib.file_digest(f, "sha256")
+        else:
+            h = hashlib.sha256()
+            view = memoryview(bytearray(DOWNLOAD_BUFFER_SIZE))
+            for n in iter(lambda: f.readinto(view), 0):
+                h.update(view[:n])
+    return h.hexdigest() if hexdigest else h
 
+
+def write_install_marker(directory: Path, url: str, sha256: str, **extra: str) -> None:
+    """Record a completed installation in ``directory`` (source URL, archive hash, timestamp)."""
+
+    info: Dict[str, Any] = {"url": url, "sha256": sha256, "ts": int(time.time())}
+    info.update(extra)
     try:
-        tree = ET.parse(str(pom_path))
-        root = tree.getroot()
-        # properties > java.version
-        props = None
-        for ch in root:
-            if ns_cleanup(ch.tag) == "properties":
-                props = ch
-                break
-        if props is not None:
-            for p in props:
-                if ns_cleanup(p.tag) == "java.version" and (p.text or "").strip():
-                    v = (p.text or "").strip()
-                    log(f"[INFO] java.version encontrado em properties: {v}")
-                    return normalize_java_version(v)
-        # maven-compiler-plugin config
-        v = find_from_maven_compiler(root, ["configuration", "release"]) or \
-            find_from_maven_compiler(root, ["configuration", "compilerVersion"])  # noqa: E501
-        if v:
-            log(f"[INFO] Versão obtida do maven-compiler-plugin: {v}")
-            return normalize_java_version(v)
-        # toolchain dentro do POM (não comum, mas suportado)
-        v = find_first_text(root, ["build", "plugins", "plugin"])  # quick check
-        # Busca específica por jdkToolchain/version
-        v2 = find_in_toolchain_version(root)
-        if v2:
-            log(f"[INFO] Versão obtida de toolchain no pom.xml: {v2}")
-            return normalize_java_version(v2)
-        return None
+        (directory / INSTALLED_MARKER).write_text(json.dumps(info, indent=2), encoding="utf-8")
     except Exception as e:
-        log(f"[ERRO] Falha ao ler {pom_path}: {e}")
+        log(f"[WARN] Falha ao gravar sentinela de instalação em {directory}: {e}")
+
+
+def read_install_marker(directory: Path) -> Optional[Dict[str, Any]]:
+    """Return the installation sentinel of ``directory`` or ``None`` when absent/invalid."""
+
+    try:
+        data = json.loads((directory / INSTALLED_MARKER).read_text(encoding="utf-8"))
+    except Exception:
         return None
+    return data if isinstance(data, dict) else None
 
 
-def find_from_maven_compiler(root: ET.Element, conf_path: List[str]) -> Optional[str]:
-    """Look up compiler configuration values inside the maven-compiler-plugin."""
+# ==========================
+# POM Parsing
+# ==========================
 
-    # Procura plugin maven-compiler-plugin
-    for build in root:
-        if ns_cleanup(build.tag) != "build":
-            continue
-        for plugins in build:
-            if ns_cleanup(plugins.tag) != "plugins":
-                continue
-            for plugin in plugins:
-                if ns_cleanup(plugin.tag) != "plugin":
-                    continue
-                artifact_id = find_first_text(plugin, ["artifactId"]) or ""
-                if artifact_id.strip() == "maven-compiler-plugin":
-                    return find_first_text(plugin, conf_path)
-    return None
+_TOOLCHAIN_PLUGINS = ("maven-toolchains-plugin", "toolchains-maven-plugin")
+# Sem nenhum destes nomes de elemento o pom não tem como indicar a versão Java
+_POM_VERSION_HINTS = (b"java.version", b"release", b"compilerVersion", b"jdkToolchain")
+# Versões no formato legado (1.8, 1.8.0_292) e no formato atual (17, 17.0.9)
+_LEADING_ONE_DOT = re.compile(r"^1\.(\d+)(?:\.|$)")
+_MAJOR_RE = re.compile(r"^(\d{1,2})")
 
 
-def find_in_toolchain_version(root: ET.Element) -> Optional[str]:
-    """Search toolchain configurations for declared Java versions."""
+def parse_java_version_from_pom(pom_path: Path) -> Optional[str]:
+    """Return the Java version of a pom.xml, reusing the cached result when it is unchanged."""
 
-    # Busca aproximação por jdkToolchain/version
-    # Alguns plugins (maven-toolchains-plugin) podem declarar dentro de build/plugins
-    for build in root:
-        if ns_cleanup(build.tag) != "build":
-            continue
-        for plugins in build:
-            if ns_cleanup(plugins.tag) != "plugins":
+    try:
+        st = os.stat(pom_path)
+    except OSError as e:
+        log(f"[ERRO] Falha ao ler {pom_path}: {e}")
+        return None
+
+    poms = _state_section("poms")
+    key = str(pom_path.resolve())
+    cached = poms.get(key)
+    if (
+        isinstance(cached, dict)
+        and cached.get("mtime_ns") == st.st_mtime_ns
+        and cached.get("size") == st.st_size
+        and "java_version" in cached
+    ):
+        if not cached["java_version"]:
+            log(f"[INFO] pom.xml sem versão Java (resultado em cache): {pom_path}")
+            return None
+        log(f"[INFO] Versão Java em cache para {pom_path}: {cached['java_version']}")
+        return str(cached["java_version"])
+
+    try:
+        java_version = _read_java_version_from_pom(pom_path)
+    except Exception as e:
+        # XML inválido não vai para o cache: o erro volta a aparecer até o arquivo ser corrigido
+        log(f"[ERRO] Falha ao ler {pom_path}: {e}")
+        return None
+    # Resultado negativo também fica em cache: pom sem versão não é relido a cada execução
+    poms[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "java_version": java_version}
+    _mark_state_dirty()
+    return java_version
+
+
+@functools.lru_cache(maxsize=256)
+def _local_name(tag: str) -> str:
+    """Strip the ``{namespace}`` prefix from an ElementTree tag."""
+
+    return tag.rsplit("}", 1)[-1]
+
+
+def _read_java_version_from_pom(pom_path: Path) -> Optional[str]:
+    """Extract the target Java version from a pom.xml using common heuristics.
+
+    The file is streamed with ``iterparse``; only the top-level ``properties``
+    and ``build`` subtrees are inspected, through ElementTree's C path matcher,
+    and parsing stops as soon as no better hint can follow. Files that mention
+    none of the hint element names skip the parser. Parse errors propagate to
+    the caller.
+    """
+
+    depth = 0
+    ns = ""
+    section = ""
+    section_el: Any = None
+    props_done = False
+    compiler: Optional[Dict[str, str]] = None
+    toolchain_version: Optional[str] = None
+
+    data = pom_path.read_bytes()
+    # Varredura de bytes antes do parser: módulos filhos que herdam a versão do pai
+    # (nenhuma dica no arquivo) não passam pelo XML. UTF-16 fica de fora da varredura.
+    if not data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) and not any(
+        hint in data for hint in _POM_VERSION_HINTS
+    ):
+        return None
+    with io.BytesIO(data) as f:
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if depth == 0 and el.tag.startswith("{"):
+                    # Namespace detectado uma vez na raiz e reutilizado em todos os caminhos
+                    ns = el.tag[: el.tag.index("}") + 1]
+                elif depth == 1:
+                    section, section_el = _local_name(el.tag), el
+                depth += 1
                 continue
-            for plugin in plugins:
-                if ns_cleanup(plugin.tag) != "plugin":
-                    continue
-                artifact_id = find_first_text(plugin, ["artifactId"]) or ""
-                if artifact_id.strip() in ("maven-toolchains-plugin", "toolchains-maven-plugin"):
-                    # procurar <jdkToolchain><version>17</version></jdkToolchain>
-                    conf = None
-                    for ch in plugin:
-                        if ns_cleanup(ch.tag) == "configuration":
-                            conf = ch
-                            break
-                    if conf is not None:
-                        # procurar jdkToolchain/version
-                        for ch in conf.iter():
-                            if ns_cleanup(ch.tag) == "jdkToolchain":
-                                v = find_first_text(ch, ["version"])  # type: ignore
-                                if v:
-                                    return v
+            depth -= 1
+            if depth != 1:
+                if depth == 2 and section not in ("properties", "build"):
+                    # Fora das seções de interesse (dependencies, profiles...): descartar cada
+                    # filho assim que termina, para a memória não crescer com o documento
+                    section_el.clear()
+                continue
+            # Filho direto de <project> concluído: só properties/build interessam
+            name = section
+            if name == "properties" and not props_done:
+                # Maior prioridade: encerra a leitura imediatamente
+                text = (el.findtext(f"{ns}java.version") or "").strip()
+                if text:
+                    log(f"[INFO] java.version encontrado em properties: {text}")
+                    return normalize_java_version(text)
+                props_done = True
+            elif name == "build":
+                for plugin in el.iterfind(f"{ns}plugins/{ns}plugin"):
+                    artifact_id = (plugin.findtext(f"{ns}artifactId") or "").strip()
+                    if artifact_id == "maven-compiler-plugin" and compiler is None:
+                        compiler = {
+                            key: (plugin.findtext(f"{ns}configuration/{ns}{key}") or "").strip()
+                            for key in ("release", "compilerVersion")
+                        }
+                    elif artifact_id in _TOOLCHAIN_PLUGINS and toolchain_version is None:
+                        toolchain_version = next(
+                            (
+                                v.text.strip()
+                                for v in plugin.iterfind(f"{ns}configuration//{ns}jdkToolchain/{ns}version")
+                                if v.text and v.text.strip()
+                            ),
+                            None,
+                        )
+            el.clear()
+            # Sem java.version possível depois de </properties>: o compiler-plugin decide
+            if props_done and compiler and (compiler.get("release") or compiler.get("compilerVersion")):
+                break
+
+    # maven-compiler-plugin config
+    v = compiler and (compiler.get("release") or compiler.get("compilerVersion"))
+    if v:
+        log(f"[INFO] Versão obtida do maven-compiler-plugin: {v}")
+        return normalize_java_version(v)
+    # toolchain dentro do POM (não comum, mas suportado): <jdkToolchain><version>17</version>
+    if toolchain_version:
+        log(f"[INFO] Versão obtida de toolchain no pom.xml: {toolchain_version}")
+        return normalize_java_version(toolchain_version)
     return None
 
 
@@ -471,53 +750,548 @@ def normalize_java_version(v: str) -> Optional[str]:
     """Normalize values such as ``1.8`` or ``17.0.9`` to their major version."""
 
     v = v.strip()
+    # Caso mais comum ("17", "21"): já é o maior, sem passar por regex.
+    # isdecimal() aceita exatamente o que \d aceita, então o resultado é o mesmo
+    if len(v) <= 2 and v.isdecimal():
+        return v
     # Mapear 1.8 -> 8
-    if v.startswith("1."):
-        parts = v.split(".")
-        if len(parts) >= 2 and parts[1].isdigit():
-            return parts[1]
-    # Aceitar qualquer maior inteiro (non‑LTS também)
-    m = re.match(r"^(\d{1,2})", v)
+    m = _LEADING_ONE_DOT.match(v)
     if m:
         return m.group(1)
-    return None
+    # Aceitar qualquer maior inteiro (non‑LTS também)
+    m = _MAJOR_RE.match(v)
+    return m.group(1) if m else None
 
 
 # ==========================
 # Download e Extração
 # ==========================
 
-def download_with_retries(url: str, dest: Path, attempts: int = 3, backoff: float = 1.5) -> bool:
-    """Download a URL with retry attempts and exponential backoff."""
+_CONTENT_RANGE_RE = re.compile(r"bytes \d+-\d+/(\d+)")
+
+
+def _content_total(headers: Any, status: int) -> Optional[int]:
+    """Return the full entity size from ``Content-Range`` (206) or ``Content-Length`` (200)."""
+
+    if status == 206:
+        m = _CONTENT_RANGE_RE.match(headers.get("Content-Range") or "")
+        return int(m.group(1)) if m else None
+    length = headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+# Conexões HTTP(S) ociosas por (esquema, host): evita um novo handshake TLS a cada arquivo
+_CONN_POOL: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+_CONN_POOL_LOCK = threading.Lock()
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_USER_AGENT = f"Python-urllib/{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+def _acquire_connection(key: Tuple[str, str], timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+    """Take an idle keep-alive connection for ``key`` or open a new one; flag whether it was reused."""
+
+    import http.client
+
+    with _CONN_POOL_LOCK:
+        idle = _CONN_POOL.get(key)
+        conn = idle.pop() if idle else None
+    if conn is not None:
+        conn.timeout = timeout
+        try:
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        except OSError:
+            conn.close()
+    scheme, netloc = key
+    cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+    return cls(netloc, timeout=timeout), False
+
+
+def _release_connection(key: Tuple[str, str], conn: http.client.HTTPConnection) -> None:
+    with _CONN_POOL_LOCK:
+        idle = _CONN_POOL.setdefault(key, [])
+        # No máximo uma conexão ociosa por worker: mais que isso nunca seria reutilizada
+        if len(idle) < MAX_PROVISION_WORKERS:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+class _PooledResponse(io.RawIOBase):
+    """Raw stream over an HTTP response that returns its connection to the pool when fully read."""
+
+    def __init__(self, key: Tuple[str, str], conn: http.client.HTTPConnection, resp: http.client.HTTPResponse) -> None:
+        super().__init__()
+        self._key = key
+        self._conn: Optional[http.client.HTTPConnection] = conn
+        self._resp = resp
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        return self._resp.readinto(b)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            if self._resp.isclosed() and not self._resp.will_close:
+                _release_connection(self._key, self._conn)
+            else:
+                # Corpo não consumido por inteiro: a conexão não pode ser reaproveitada
+                self._resp.close()
+                self._conn.close()
+            self._conn = None
+        super().close()
+
 
+def _http_open(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = DOWNLOAD_TIMEOUT) -> Any:
+    """GET ``url`` reusing keep-alive connections; raise ``HTTPError`` like :func:`urlopen`."""
+
+    import http.client
     import urllib.request
+
+    headers = dict(headers or {})
+    headers.setdefault("User-Agent", _USER_AGENT)
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or parts.scheme in urllib.request.getproxies():
+            # Proxy configurado (ou esquema exótico): deixar o urllib cuidar da conexão
+            return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+        key = (parts.scheme, parts.netloc)
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        while True:
+            conn, reused = _acquire_connection(key, timeout)
+            try:
+                conn.request("GET", target, headers=headers)
+                resp = conn.getresponse()
+                break
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if not reused:
+                    raise
+                # Conexão ociosa fechada pelo servidor: tentar de novo com uma nova
+
+        if resp.status in _REDIRECT_CODES and resp.getheader("Location"):
+            resp.read()
+            _PooledResponse(key, conn, resp).close()
+            url = urllib.parse.urljoin(url, resp.getheader("Location"))
+            continue
+        if resp.status >= 300:
+            body = resp.read()
+            _PooledResponse(key, conn, resp).close()
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        return _PooledResponse(key, conn, resp)
+    raise urllib.error.URLError(f"redirecionamentos demais ({MAX_REDIRECTS}): {url}")
+
+
+def _retry_delay(attempt: int, backoff: float, error: Exception) -> float:
+    """Seconds to wait before the next attempt: capped exponential with jitter, or Retry-After."""
+
+    headers = getattr(error, "headers", None)
+    retry_after = headers.get("Retry-After") if headers is not None else None
+    if retry_after:
+        retry_after = retry_after.strip()
+        if retry_after.isdigit():
+            return min(RETRY_BACKOFF_CAP, float(retry_after))
+        import email.utils
+
+        try:
+            when = email.utils.parsedate_to_datetime(retry_after).timestamp()
+            return min(RETRY_BACKOFF_CAP, max(0.0, when - time.time()))
+        except (TypeError, ValueError):
+            pass
+    # Jitter de 0.5x a 1.5x: downloads paralelos não retentam todos no mesmo instante
+    return min(RETRY_BACKOFF_CAP, backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+
+
+def probe_download_url(url: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """Tell whether ``url`` currently serves content, using a one-byte ranged GET."""
+
+    # GET com Range em vez de HEAD: alguns CDNs/redirecionamentos tratam HEAD de forma diferente
+    try:
+        with _http_open(url, {"Range": "bytes=0-0"}, timeout) as r:
+            if r.status == 206:
+                r.read()  # corpo de 1 byte lido: a conexão aquecida volta ao pool
+            return r.status in (200, 206)
+    except Exception:
+        return False
+
+
+def _edge_digests(path: Path) -> Tuple[str, str]:
+    """Return the SHA-256 of the first and last ``EDGE_PROBE_SIZE`` bytes of ``path``."""
+
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        head = f.read(EDGE_PROBE_SIZE)
+        f.seek(max(0, size - EDGE_PROBE_SIZE))
+        tail = f.read(EDGE_PROBE_SIZE)
+    return hashlib.sha256(head).hexdigest(), hashlib.sha256(tail).hexdigest()
+
+
+def _remote_edges_match(url: str, meta: Dict[str, Any], timeout: float) -> bool:
+    """Tell whether the remote entity has the recorded size and head/tail digests."""
+
+    size = meta["size"]
+    ranges = (
+        (f"bytes=0-{min(size, EDGE_PROBE_SIZE) - 1}", meta["head_sha256"]),
+        (f"bytes={max(0, size - EDGE_PROBE_SIZE)}-{size - 1}", meta["tail_sha256"]),
+    )
+    try:
+        for spec, expected in ranges:
+            with _http_open(url, {"Range": spec}, timeout) as r:
+                if r.status != 206 or _content_total(r.headers, r.status) != size:
+                    return False
+                if hashlib.sha256(r.read()).hexdigest() != expected:
+                    return False
+    except Exception:
+        return False
+    return True
+
+
+def _finish_download_meta(url: str, dest: Path, sha256: str) -> None:
+    """Record the digest of a finished download (plus edge digests when the server has no validators)."""
+
+    meta = _state_section("downloads")[url]
+    meta["sha256"] = sha256
+    if not (meta.get("etag") or meta.get("last_modified")) and meta.get("size"):
+        # Sem validadores HTTP: guardar início/fim para conferir a próxima versão
+        meta["head_sha256"], meta["tail_sha256"] = _edge_digests(dest)
+    _mark_state_dirty()
+
+
+def _parallel_download(url: str, dest: Path, timeout: float) -> bool:
+    """Fetch a large ranged resource into ``dest`` over ``PARALLEL_DOWNLOAD_PARTS`` connections.
+
+    Returns ``False``, leaving ``dest`` untouched, when the server is not
+    eligible or a segment fails; the caller then uses a single stream.
+    """
+
+    import http.client
+
+    try:
+        with _http_open(url, {"Range": "bytes=0-0"}, timeout) as r:
+            if r.status != 206:
+                # Range ignorado (200): fechar sem ler; ler aqui baixaria o arquivo inteiro à toa
+                return False
+            r.read()  # corpo de 1 byte lido: a conexão aquecida volta ao pool
+            headers = r.headers
+    except Exception:
+        return False
+    size = _content_total(headers, 206)
+    if not size or size < PARALLEL_DOWNLOAD_MIN_SIZE:
+        return False
+    validator = headers.get("ETag") or headers.get("Last-Modified")
+    step = -(-size // PARALLEL_DOWNLOAD_PARTS)
+    spans = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+    # Arquivo à parte: um download em partes interrompido nunca parece uma cópia completa
+    tmp = dest.with_name(dest.name + ".parts")
+
+    def fetch(span: Tuple[int, int]) -> None:
+        pos, end = span
+        view = memoryview(bytearray(DOWNLOAD_BUFFER_SIZE))
+        for i in range(1, PARALLEL_PART_ATTEMPTS + 1):
+            part_headers = {"Range": f"bytes={pos}-{end}"}
+            if validator:
+                part_headers["If-Range"] = validator  # versão mudou no meio: 200 em vez de 206
+            try:
+                with _http_open(url, part_headers, timeout) as part, open(tmp, "r+b") as f:
+                    content_range = part.headers.get("Content-Range") or ""
+                    if part.status != 206 or not content_range.startswith(f"bytes {pos}-"):
+                        raise ValueError("servidor não respeitou o Range")
+                    f.seek(pos)
+                    while pos <= end:
+                        n = part.readinto(view[: min(end - pos + 1, len(view))])
+                        if not n:
+                            raise IOError(f"segmento até {end} incompleto em {pos}")
+                        f.write(view[:n])
+                        pos += n
+                return
+            except (OSError, http.client.HTTPException) as e:
+                if i == PARALLEL_PART_ATTEMPTS:
+                    raise
+                # Só este segmento é retomado, a partir do último byte gravado
+                time.sleep(_retry_delay(i, 1.5, e))
+
+    log(f"[DOWN] Baixando em {len(spans)} partes paralelas ({size} bytes): {url}")
+    try:
+        with open(tmp, "wb") as f:
+            f.truncate(size)
+        with ThreadPoolExecutor(max_workers=len(spans)) as executor:
+            list(executor.map(fetch, spans))
+        os.replace(tmp, dest)
+    except Exception as e:
+        log(f"[WARN] Download em partes falhou ({e}); usando uma única conexão.")
+        tmp.unlink(missing_ok=True)
+        return False
+    _state_section("downloads")[url] = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "size": size,
+    }
+    # Partes chegam fora de ordem: o hash é calculado uma vez no arquivo final
+    _finish_download_meta(url, dest, _sha256_file(dest))
+    log(f"[OK] Download concluído: {dest}")
+    return True
+
+
+def download_with_retries(
+    url: str, dest: Path, attempts: int = 3, backoff: float = 1.5, timeout: float = DOWNLOAD_TIMEOUT
+) -> bool:
+    """Download a URL with retries, resuming partial files and honouring HTTP 304.
+
+    Validators (``ETag``/``Last-Modified``) are kept in the state file, so an
+    unchanged "latest" artifact costs a single conditional request. Without
+    validators, matching size and head/tail digests skip the download instead.
+    """
+
+    downloads = _state_section("downloads")
     last_err: Optional[Exception] = None
     for i in range(1, attempts + 1):
         try:
+            meta = downloads.get(url) if isinstance(downloads.get(url), dict) else {}
+            etag = meta.get("etag")
+            last_modified = meta.get("last_modified")
+            existing = dest.stat().st_size if dest.exists() else 0
+            headers: Dict[str, str] = {}
+            if (
+                existing
+                and not (etag or last_modified)
+                and existing == meta.get("size")
+                and meta.get("head_sha256")
+                and meta.get("tail_sha256")
+                and _remote_edges_match(url, meta, timeout)
+            ):
+                log(f"[OK] Tamanho e trechos iniciais/finais conferem; reutilizando: {dest}")
+                return True
+            if existing and (etag or last_modified):
+                if existing == meta.get("size"):
+                    # Cópia completa: só baixa de novo se o servidor tiver outra versão
+                    if etag:
+                        headers["If-None-Match"] = etag
+                    if last_modified:
+                        headers["If-Modified-Since"] = last_modified
+                else:
+                    # Cópia parcial: retoma do ponto onde parou, se a versão ainda for a mesma
+                    headers["Range"] = f"bytes={existing}-"
+                    headers["If-Range"] = etag or last_modified
+            if not existing and i == 1 and _parallel_download(url, dest, timeout):
+                return True
             log(f"[DOWN] Baixando (tentativa {i}/{attempts}): {url}")
-            with urllib.request.urlopen(url, timeout=60) as r, open(dest, "wb") as f:
-                shutil.copyfileobj(r, f)
+            try:
+                r = _http_open(url, headers, timeout)
+            except urllib.error.HTTPError as e:
+                if e.code == 304:
+                    log(f"[OK] Artefato inalterado no servidor; reutilizando: {dest}")
+                    return True
+                if e.code == 416:
+                    dest.unlink(missing_ok=True)  # parcial inválido: recomeçar do zero
+                raise
+            with r:
+                total = _content_total(r.headers, r.status)
+                downloads[url] = {
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "size": total,
+                }
+                _mark_state_dirty()
+                mode = "ab" if r.status == 206 else "wb"
+                if mode == "ab":
+                    log(f"[DOWN] Retomando download a partir de {existing} bytes: {dest.name}")
+                    h = _sha256_file(dest, hexdigest=False)
+                else:
+                    h = hashlib.sha256()
+                # Hash calculado durante a cópia: nenhuma releitura do arquivo depois.
+                # Um único buffer reaproveitado (readinto): nenhum bytes novo por bloco
+                view = memoryview(bytearray(DOWNLOAD_BUFFER_SIZE))
+                with open(dest, mode) as f:
+                    while True:
+                        n = r.readinto(view)
+                        if not n:
+                            break
+                        f.write(view[:n])
+                        h.update(view[:n])
+            if total is not None and dest.stat().st_size != total:
+                raise IOError(f"download incompleto ({dest.stat().st_size}/{total} bytes)")
+            _finish_download_meta(url, dest, h.hexdigest())
             log(f"[OK] Download concluído: {dest}")
             return True
         except Exception as e:
             last_err = e
-            wait = backoff ** i
+            if i == attempts:
+                log(f"[WARN] Falha no download: {e}.")
+                break
+            wait = _retry_delay(i, backoff, e)
             log(f"[WARN] Falha no download: {e}. Retentando em {wait:.1f}s...")
             time.sleep(wait)
     log(f"[ERRO] Falha definitiva ao baixar {url}: {last_err}")
     return False
 
 
-def extract_archive(archive_path: Path, dest_dir: Path) -> bool:
-    """Extract ``.zip`` or ``.tar.gz`` archives to the destination folder."""
+def is_download_complete(url: str, dest: Path) -> bool:
+    """Tell whether ``dest`` matches the size and SHA-256 recorded when ``url`` was downloaded."""
+
+    if not dest.exists() or dest.stat().st_size == 0:
+        return False
+    meta = _state_section("downloads").get(url)
+    if not isinstance(meta, dict) or meta.get("size") is None:
+        return True  # arquivo colocado manualmente ou de versão anterior: confiar nele
+    if dest.stat().st_size != meta["size"]:
+        return False
+    if meta.get("sha256") and _sha256_file(dest) != meta["sha256"]:
+        # Cópia corrompida no cache: descartar para não revalidar (304) um arquivo inválido
+        log(f"[WARN] SHA-256 divergente em {dest}; baixando novamente.")
+        dest.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def archive_sha256(url: str, dest: Path) -> str:
+    """Return the SHA-256 recorded while downloading ``url``, hashing ``dest`` only if unknown."""
+
+    meta = _state_section("downloads").get(url)
+    if isinstance(meta, dict) and meta.get("sha256") and meta.get("size") == dest.stat().st_size:
+        return str(meta["sha256"])
+    return _sha256_file(dest)
+
+
+def _system_tar_command(dest_dir: Path, source: str = "-") -> Optional[List[str]]:
+    """Build a system ``tar`` command for gzip archives, or ``None`` to use :mod:`tarfile`."""
+
+    # No Windows mantemos o tarfile; no Linux/macOS o tar do sistema é bem mais rápido
+    if sys.platform.startswith("win"):
+        return None
+    tar = shutil.which("tar")
+    if not tar:
+        return None
+    if shutil.which("pigz"):
+        return [tar, "--use-compress-program=pigz", "-xf", source, "-C", str(dest_dir)]
+    return [tar, "-xzf", source, "-C", str(dest_dir)]
+
+
+@functools.lru_cache(maxsize=None)
+def _bsdtar() -> Optional[str]:
+    """Return the system ``tar`` if it is bsdtar/libarchive, which also unpacks ``.zip``."""
+
+    # Windows 10 1803+ e macOS trazem bsdtar; o GNU tar do Linux não lê .zip
+    tar = shutil.which("tar")
+    if not tar:
+        return None
+    try:
+        out = subprocess.run([tar, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except Exception:
+        return None
+    return tar if "bsdtar" in out else None
+
+
+def _strip_components(name: str, count: int) -> str:
+    """Drop the first ``count`` path components of an archive member name (like ``tar``)."""
+
+    parts = name.lstrip("/").split("/", count)
+    return parts[count] if len(parts) > count else ""
+
+
+def _extract_zipfile(archive_path: Path, dest_dir: Path, strip: int = 0) -> None:
+    """Extract a ``.zip`` with :mod:`zipfile`, spreading large archives over worker threads."""
+
+    workers = ZIP_EXTRACT_WORKERS if archive_path.stat().st_size >= PARALLEL_EXTRACT_MIN_SIZE else 1
+
+    def extract_slice(index: int) -> None:
+        # ZipFile próprio por worker: o handle do arquivo não é compartilhado entre threads
+        with open(archive_path, "rb", buffering=ZIP_READ_BUFFER) as fh, zipfile.ZipFile(fh) as z:
+            for info in z.infolist()[index::workers]:
+                if strip:
+                    info.filename = _strip_components(info.filename, strip)
+                    if not info.filename:
+                        continue
+                try:
+                    z.extract(info, dest_dir)
+                except FileExistsError:
+                    z.extract(info, dest_dir)  # outro worker criou a pasta pai no mesmo instante
+
+    if workers == 1:
+        extract_slice(0)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(extract_slice, range(workers)))
+
+
+def _extract_tarfile(fileobj: BinaryIO, dest_dir: Path, strip: int = 0) -> None:
+    """Extract a gzip tar with :mod:`tarfile` in streaming mode (no seeks, no member index)."""
+
+    # Python 3.12+ (e backports): filtro "data" bloqueia caminhos absolutos/fora do destino
+    kwargs: Dict[str, Any] = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as t:
+        if not strip:
+            t.extractall(dest_dir, **kwargs)
+            return
+        for member in t:
+            member.name = _strip_components(member.name, strip)
+            if not member.name:
+                continue
+            if member.islnk():
+                member.linkname = _strip_components(member.linkname, strip)
+            t.extract(member, dest_dir, **kwargs)
+
+
+def _extract_tar_stream(stream: BinaryIO, dest_dir: Path) -> None:
+    """Extract a gzip tar stream, piping it to the system ``tar`` when available."""
 
+    cmd = _system_tar_command(dest_dir)
+    if cmd is None:
+        _extract_tarfile(stream, dest_dir)
+        return
+
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=err)
+        assert proc.stdin is not None
+        try:
+            try:
+                shutil.copyfileobj(stream, proc.stdin, STREAM_BUFFER_SIZE)
+            finally:
+                proc.stdin.close()
+        except BrokenPipeError:
+            pass  # tar encerrou antes do fim do stream; o código de saída diz se houve erro
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        code = proc.wait()
+        if code != 0:
+            err.seek(0)
+            detail = err.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"tar terminou com código {code}: {detail}")
+
+
+def extract_archive(archive_path: Path, dest_dir: Path, strip: int = 0) -> bool:
+    """Extract ``.zip`` or ``.tar.gz`` archives to the destination folder.
+
+    ``strip`` drops leading path components from every member, like
+    ``tar --strip-components``, so single-root archives land directly in ``dest_dir``.
+    """
+
+    strip_args = [f"--strip-components={strip}"] if strip else []
     try:
         if archive_path.suffix == ".zip":
-            with zipfile.ZipFile(archive_path, 'r') as z:
-                z.extractall(dest_dir)
+            bsdtar = _bsdtar()
+            if bsdtar:
+                subprocess.run(
+                    [bsdtar, "-xf", str(archive_path), "-C", str(dest_dir)] + strip_args,
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                )
+            else:
+                _extract_zipfile(archive_path, dest_dir, strip)
         elif archive_path.suffixes[-2:] == [".tar", ".gz"] or archive_path.suffix == ".tgz":
-            with tarfile.open(archive_path, 'r:gz') as t:
-                t.extractall(dest_dir)
+            cmd = _system_tar_command(dest_dir, str(archive_path))
+            if cmd is not None:
+                subprocess.run(cmd + strip_args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            else:
+                with open(archive_path, "rb", buffering=DOWNLOAD_BUFFER_SIZE) as fh:
+                    _extract_tarfile(fh, dest_dir, strip)
         else:
             log(f"[ERRO] Formato de arquivo não suportado: {archive_path}")
             return False
@@ -528,6 +1302,77 @@ def extract_archive(archive_path: Path, dest_dir: Path) -> bool:
         return False
 
 
+class _HashingReader:
+    """Read-only file wrapper that feeds every byte read into a SHA-256 digest."""
+
+    def __init__(self, raw: BinaryIO) -> None:
+        self._raw = raw
+        self.digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        self.digest.update(data)
+        return data
+
+
+def _download_and_extract_cached(
+    url: str, dest_dir: Path, ext: str, attempts: int, backoff: float, timeout: float
+) -> Optional[str]:
+    """Download ``url`` into the cache (resumable) and extract it; return its SHA-256 on success."""
+
+    # Nome derivado da URL: um parcial só é retomado a partir da mesma origem
+    url_id = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+    archive = CACHE_DIR / f"{dest_dir.name}-{url_id}.{ext}"
+    _ensure_dir(CACHE_DIR)
+    # Fica no cache: parciais são retomados com Range e cópias completas revalidadas (304)
+    if not download_with_retries(url, archive, attempts, backoff, timeout):
+        return None
+    if not extract_archive(archive, dest_dir):
+        return None
+    return archive_sha256(url, archive)
+
+
+def stream_download_and_extract(
+    url: str,
+    dest_dir: Path,
+    ext: str,
+    attempts: int = 3,
+    backoff: float = 1.5,
+    timeout: float = DOWNLOAD_TIMEOUT,
+) -> Optional[str]:
+    """Download and extract an archive on the fly; return its SHA-256 on success.
+
+    Only the first attempt streams: once it fails, the remaining attempts go
+    through the cache, where an interrupted download resumes instead of
+    starting over.
+    """
+
+    if ext != "tar.gz":
+        # .zip guarda o diretório central no final do arquivo: precisa de um arquivo local
+        return _download_and_extract_cached(url, dest_dir, ext, attempts, backoff, timeout)
+
+    try:
+        log(f"[DOWN] Baixando e extraindo (tentativa 1/{attempts}): {url}")
+        with _http_open(url, timeout=timeout) as r:
+            stream = _HashingReader(io.BufferedReader(r, buffer_size=STREAM_BUFFER_SIZE))
+            _extract_tar_stream(stream, dest_dir)
+            # O extrator pode parar no marcador de fim do tar; consumir o resto completa o hash
+            while stream.read(STREAM_BUFFER_SIZE):
+                pass
+        log(f"[OK] Download e extração concluídos em: {dest_dir}")
+        return stream.digest.hexdigest()
+    except Exception as e:
+        if attempts == 1:
+            log(f"[WARN] Falha no download/extração: {e}.")
+            log(f"[ERRO] Falha definitiva ao baixar/extrair {url}: {e}")
+            return None
+        wait = _retry_delay(1, backoff, e)
+        # Um stream interrompido não pode ser retomado: as próximas tentativas usam o cache
+        log(f"[WARN] Falha no download/extração: {e}. Tentando via cache (com retomada) em {wait:.1f}s...")
+        time.sleep(wait)
+    return _download_and_extract_cached(url, dest_dir, ext, attempts - 1, backoff, timeout)
+
+
 # ==========================
 # Maven settings / toolchains
 # ==========================
@@ -535,16 +1380,129 @@ def extract_archive(archive_path: Path, dest_dir: Path) -> bool:
 def ensure_m2_dirs():
     """Ensure the ~/.m2 directory exists."""
 
-    M2_DIR.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(M2_DIR)
+
+
+def xml_escape(data: str) -> str:
+    """Escape ``&``, ``<`` and ``>`` exactly like :func:`xml.sax.saxutils.escape`."""
+
+    # xml.sax.saxutils importa urllib.request (e ssl) só para isto
+    return data.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
+
+
+def _xml_tag(name: str) -> Tuple[str, str]:
+    """Regex fragments for the opening/closing ``name`` tag, with or without a namespace prefix."""
+
+    return rf"<(?:[\w.-]+:)?{name}(?:\s[^>]*)?>", rf"</(?:[\w.-]+:)?{name}\s*>"
+
+
+def _xml_element(name: str) -> "re.Pattern[str]":
+    """Match a ``name`` element and capture its body (first non-nested occurrence)."""
+
+    open_tag, close_tag = _xml_tag(name)
+    return re.compile(rf"{open_tag}(.*?){close_tag}", re.DOTALL)
+
+
+_TOOLCHAIN_RE = _xml_element("toolchain")
+_PROVIDES_RE = _xml_element("provides")
+_VERSION_RE = _xml_element("version")
+_CONFIGURATION_RE = _xml_element("configuration")
+_EMPTY_CONFIGURATION_RE = re.compile(r"<((?:[\w.-]+:)?configuration)\s*/>")
+_JDK_HOME_RE = _xml_element("jdkHome")
+_EMPTY_JDK_HOME_RE = re.compile(r"<((?:[\w.-]+:)?jdkHome)\s*/>")
+_TOOLCHAINS_CLOSE_RE = re.compile(_xml_tag("toolchains")[1])
+_XML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_XML_ENCODING_RE = re.compile(rb"""<\?xml[^>]*?\sencoding\s*=\s*["']([A-Za-z][\w.-]*)["']""")
+
+
+def _xml_encoding(data: bytes) -> str:
+    """Return the codec of an XML document: BOM first, then the declaration, else UTF-8."""
+
+    if data.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    declared = _XML_ENCODING_RE.match(data)
+    return declared.group(1).decode("ascii") if declared else "utf-8"
+
+
+def _mask_xml_comments(text: str) -> str:
+    """Blank out comments keeping offsets, so commented-out entries are never edited."""
+
+    return _XML_COMMENT_RE.sub(lambda m: " " * len(m.group()), text)
+
+
+def _toolchain_jdk_home_edit(text: str, java_version: str, jdk_home: str) -> Optional[str]:
+    """Return ``text`` with the jdkHome of the ``java_version`` toolchain set, or ``None`` if absent."""
+
+    for tc in _TOOLCHAIN_RE.finditer(_mask_xml_comments(text)):
+        provides = _PROVIDES_RE.search(tc.group(1))
+        version = _VERSION_RE.search(provides.group(1)) if provides else None
+        if not version or version.group(1).strip() != java_version:
+            continue
+        body_start = tc.start(1)
+        conf = _CONFIGURATION_RE.search(tc.group(1))
+        if conf is None:
+            empty = _EMPTY_CONFIGURATION_RE.search(tc.group(1))
+            if empty is None:
+                continue
+            # <configuration/> vazio: expandir com o jdkHome
+            tag = empty.group(1)
+            a, b = body_start + empty.start(), body_start + empty.end()
+            return f"{text[:a]}<{tag}><jdkHome>{jdk_home}</jdkHome></{tag}>{text[b:]}"
+        home = _JDK_HOME_RE.search(conf.group(1))
+        if home is None:
+            empty = _EMPTY_JDK_HOME_RE.search(conf.group(1))
+            if empty is not None:
+                # <jdkHome/> vazio: preencher no lugar em vez de inserir um segundo
+                tag = empty.group(1)
+                a, b = body_start + conf.start(1) + empty.start(), body_start + conf.start(1) + empty.end()
+                return f"{text[:a]}<{tag}>{jdk_home}</{tag}>{text[b:]}"
+            pos = body_start + conf.start(1)
+            return f"{text[:pos]}<jdkHome>{jdk_home}</jdkHome>{text[pos:]}"
+        a, b = body_start + conf.start(1) + home.start(1), body_start + conf.start(1) + home.end(1)
+        return text[:a] + jdk_home + text[b:]
+    return None
+
+
+# (versão, jdkHome) -> (mtime_ns, tamanho) do toolchains.xml logo após a última mescla
+_MERGED_TOOLCHAINS: Dict[Tuple[str, str], Tuple[int, int]] = {}
+
+
+def _toolchains_stat(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
 
 def merge_toolchains(java_version: str, java_home: Path) -> None:
-    """Create or merge toolchains.xml with the requested Java version entry."""
+    """Create or merge toolchains.xml with the requested Java version entry.
+
+    Edits are done on the text itself, so user formatting and comments survive.
+    Projects sharing a JDK skip the file entirely once it has been merged.
+    """
 
     ensure_m2_dirs()
     toolchains = M2_DIR / "toolchains.xml"
-    template = (
-        "<toolchains>\n"
+    jdk_home = xml_escape(java_home.as_posix())
+    key = (java_version, jdk_home)
+    if key in _MERGED_TOOLCHAINS and _MERGED_TOOLCHAINS[key] == _toolchains_stat(toolchains):
+        # Arquivo intocado desde a última mescla desta entrada: nada a reler nem validar
+        log(f"[SKIP] toolchains.xml já configurado para Java {java_version}")
+        return
+    _merge_toolchains_file(toolchains, java_version, jdk_home)
+    # Só mesclas concluídas entram na memória: uma falha é tentada de novo no próximo projeto
+    stat = _toolchains_stat(toolchains)
+    if stat is not None:
+        _MERGED_TOOLCHAINS[key] = stat
+
+
+def _merge_toolchains_file(toolchains: Path, java_version: str, jdk_home: str) -> None:
+    """Write the ``java_version`` entry into ``toolchains`` (create, update or append)."""
+
+    entry = (
         "  <toolchain>\n"
         "    <type>jdk</type>\n"
         "    <provides>\n"
@@ -552,66 +1510,58 @@ def merge_toolchains(java_version: str, java_home: Path) -> None:
         "      <vendor>any</vendor>\n"
         "    </provides>\n"
         "    <configuration>\n"
-        f"      <jdkHome>{java_home.as_posix()}</jdkHome>\n"
+        f"      <jdkHome>{jdk_home}</jdkHome>\n"
         "    </configuration>\n"
         "  </toolchain>\n"
-        "</toolchains>\n"
     )
+    template = f"<toolchains>\n{entry}</toolchains>\n"
 
     if not toolchains.exists():
-        toolchains.write_text(template, encoding="utf-8")
+        write_text_if_changed(toolchains, template)
         log(f"[OK] Criado ~/.m2/toolchains.xml para Java {java_version}")
         return
 
     try:
-        tree = ET.parse(str(toolchains))
-        root = tree.getroot()
-        # Verificar se já existe entrada da versão
-        for tc in root:
-            if ns_cleanup(tc.tag) != "toolchain":
-                continue
-            prov = None
-            for ch in tc:
-                if ns_cleanup(ch.tag) == "provides":
-                    prov = ch
-                    break
-            if prov is None:
-                continue
-            v = find_first_text(prov, ["version"]) or ""
-            if v.strip() == java_version:
-                # atualizar jdkHome se necessário
-                conf = None
-                for ch in tc:
-                    if ns_cleanup(ch.tag) == "configuration":
-                        conf = ch
-                        break
-                if conf is not None:
-                    home_node = None
-                    for ch in conf:
-                        if ns_cleanup(ch.tag) == "jdkHome":
-                            home_node = ch
-                            break
-                    if home_node is None:
-                        new = ET.SubElement(conf, "jdkHome")
-                        new.text = java_home.as_posix()
-                    else:
-                        home_node.text = java_home.as_posix()
-                    tree.write(str(toolchains), encoding="utf-8", xml_declaration=False)
-                    log(f"[OK] Atualizado toolchains.xml para Java {java_version}")
-                    return
-        # se não encontrou, adicionar nova toolchain
-        new_tc = ET.fromstring(template).find("toolchain")
-        if new_tc is not None:
-            root.append(new_tc)
-            tree.write(str(toolchains), encoding="utf-8", xml_declaration=False)
-            log(f"[OK] Adicionada nova toolchain para Java {java_version}")
-    except Exception as e:
+        data = toolchains.read_bytes()
+        encoding = _xml_encoding(data)
+        text = data.decode(encoding)
+    except (OSError, UnicodeError, LookupError) as e:
+        # Ilegível não é inválido: sobrescrever apagaria toolchains que só não soubemos decodificar
+        raise RuntimeError(f"toolchains.xml não pôde ser lido ({e}); arquivo preservado") from e
+
+    def write(updated: str) -> bool:
+        # Mesmo encoding do original; caracteres fora dele viram referências &#...;
+        return write_text_if_changed(toolchains, updated, encoding, "xmlcharrefreplace")
+
+    try:
+        ET.fromstring(data)  # só valida (respeitando o encoding declarado); a edição é no texto
+        updated = _toolchain_jdk_home_edit(text, java_version, jdk_home)
+        if updated is not None:
+            if write(updated):
+                log(f"[OK] Atualizado toolchains.xml para Java {java_version}")
+            else:
+                log(f"[SKIP] toolchains.xml já configurado para Java {java_version}")
+            return
+        # se não encontrou, adicionar nova toolchain antes de </toolchains>
+        closing = None
+        for closing in _TOOLCHAINS_CLOSE_RE.finditer(_mask_xml_comments(text)):
+            pass
+        if closing is None:
+            raise ValueError("elemento <toolchains> não encontrado")
+        head = text[: closing.start()]
+        if not head.endswith("\n"):
+            head += "\n"
+    except (ET.ParseError, ValueError) as e:
         log(f"[WARN] Falha ao mesclar toolchains.xml: {e}. Substituindo com entrada mínima.")
-        toolchains.write_text(template, encoding="utf-8")
+        write_text_if_changed(toolchains, template)
+        return
+    write(head + entry + text[closing.start():])
+    log(f"[OK] Adicionada nova toolchain para Java {java_version}")
 
 
+@_single_flight
 def ensure_settings_xml() -> None:
-    """Create a default settings.xml when it is missing from ~/.m2."""
+    """Create a default settings.xml when it is missing from ~/.m2 (checked once per run)."""
 
     ensure_m2_dirs()
     settings = M2_DIR / "settings.xml"
@@ -626,7 +1576,7 @@ def ensure_settings_xml() -> None:
             "  <activeProfiles/>\n"
             "</settings>\n"
         )
-        settings.write_text(content, encoding="utf-8")
+        write_text_if_changed(settings, content)
         log("[OK] Criado ~/.m2/settings.xml padrão")
     else:
         log("[INFO] ~/.m2/settings.xml já existe; preservado")
@@ -636,17 +1586,23 @@ def ensure_settings_xml() -> None:
 # VS Code settings por projeto
 # ==========================
 
-def update_vscode_settings(project_dir: Path, java_home: Path, maven_bin: Path) -> None:
-    """Update .vscode/settings.json with the expected Java/Maven VS Code settings."""
+_HOME_POSIX = HOME.as_posix().rstrip("/")
+
 
-    def as_vscode_user_path(target: Path) -> str:
-        """Render paths using the ${userHome} placeholder to keep configs portable."""
+def _as_vscode_user_path(target: Path) -> str:
+    """Render paths using the ${userHome} placeholder to keep configs portable."""
 
-        home_posix = HOME.as_posix()
-        target_posix = target.as_posix()
-        if target_posix.startswith(home_posix):
-            return target_posix.replace(home_posix, "${userHome}", 1)
-        return target_posix
+    target_posix = target.as_posix()
+    # Só a pasta home inteira: /home/ana2 não deve virar ${userHome}2
+    if target_posix == _HOME_POSIX or target_posix.startswith(_HOME_POSIX + "/"):
+        return "${userHome}" + target_posix[len(_HOME_POSIX):]
+    return target_posix
+
+
+def update_vscode_settings(
+    project_dir: Path, java_home: Path, maven_bin: Path, maven_options: Tuple[str, ...] = ()
+) -> None:
+    """Update .vscode/settings.json with the expected Java/Maven VS Code settings."""
 
     vscode_dir = project_dir / ".vscode"
     vscode_dir.mkdir(parents=True, exist_ok=True)
@@ -657,10 +1613,11 @@ def update_vscode_settings(project_dir: Path, java_home: Path, maven_bin: Path)
             data = json.loads(settings_file.read_text(encoding="utf-8"))
         except Exception:
             data = {}
+    original = dict(data)
 
-    java_home_path = as_vscode_user_path(java_home)
-    maven_bin_path = as_vscode_user_path(maven_bin)
-    user_settings_path = as_vscode_user_path(M2_DIR / "settings.xml")
+    java_home_path = _as_vscode_user_path(java_home)
+    maven_bin_path = _as_vscode_user_path(maven_bin)
+    user_settings_path = _as_vscode_user_path(M2_DIR / "settings.xml")
 
     # Atualizar/mesclar chaves relevantes
     data.pop("java.home", None)
@@ -671,25 +1628,108 @@ def update_vscode_settings(project_dir: Path, java_home: Path, maven_bin: Path)
     data["java.compile.nullAnalysis.mode"] = "automatic"
     data["java.configuration.updateBuildConfiguration"] = "automatic"
     data["java.configuration.maven.userSettings"] = user_settings_path
+    if maven_options:
+        # Acrescenta só as opções ausentes; o que o usuário já definiu é preservado
+        current = str(data.get("maven.executable.options") or "").split()
+        current += [opt for opt in maven_options if opt not in current]
+        data["maven.executable.options"] = " ".join(current)
+
+    # Mesmo conteúdo com outra formatação: não reescrever o arquivo do usuário
+    if data == original:
+        log(f"[SKIP] {settings_file} já atualizado")
+        return
+    if write_text_if_changed(settings_file, json.dumps(data, indent=2, ensure_ascii=False)):
+        log(f"[OK] Atualizado {settings_file}")
+    else:
+        log(f"[SKIP] {settings_file} já atualizado")
+
+
+# ==========================
+# Maven Build Cache por projeto
+# ==========================
+
+_BUILD_CACHE_ARTIFACT = "maven-build-cache-extension"
+_EXTENSIONS_CLOSE_RE = re.compile(_xml_tag("extensions")[1])
 
-    settings_file.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
-    log(f"[OK] Atualizado {settings_file}")
+
+def ensure_build_cache_extension(project_dir: Path) -> None:
+    """Register the Maven Build Cache extension in ``.mvn/extensions.xml`` (idempotent)."""
+
+    mvn_dir = project_dir / ".mvn"
+    mvn_dir.mkdir(parents=True, exist_ok=True)
+    extensions = mvn_dir / "extensions.xml"
+    entry = (
+        "  <extension>\n"
+        "    <groupId>org.apache.maven.extensions</groupId>\n"
+        f"    <artifactId>{_BUILD_CACHE_ARTIFACT}</artifactId>\n"
+        f"    <version>{BUILD_CACHE_EXTENSION_VERSION}</version>\n"
+        "  </extension>\n"
+    )
+
+    if not extensions.exists():
+        write_text_if_changed(
+            extensions,
+            "<extensions xmlns=\"http://maven.apache.org/EXTENSIONS/1.1.0\"\n"
+            "            xmlns:xsi=\"http://www.w3.org/2001/XMLSchema-instance\"\n"
+            "            xsi:schemaLocation=\"http://maven.apache.org/EXTENSIONS/1.1.0"
+            " https://maven.apache.org/xsd/core-extensions-1.1.0.xsd\">\n"
+            f"{entry}</extensions>\n",
+        )
+        log(f"[OK] Criado {extensions} com o Maven Build Cache")
+    else:
+        text = extensions.read_text(encoding="utf-8")
+        masked = _mask_xml_comments(text)
+        if _BUILD_CACHE_ARTIFACT in masked:
+            log(f"[SKIP] Build Cache já registrado em {extensions}")
+        else:
+            closing = None
+            for closing in _EXTENSIONS_CLOSE_RE.finditer(masked):
+                pass
+            if closing is None:
+                log(f"[WARN] {extensions} sem </extensions>; Build Cache não registrado.")
+                return
+            head = text[: closing.start()]
+            if not head.endswith("\n"):
+                head += "\n"
+            write_text_if_changed(extensions, head + entry + text[closing.start():])
+            log(f"[OK] Build Cache adicionado a {extensions}")
+
+    config = mvn_dir / "maven-build-cache-config.xml"
+    if not config.exists():
+        # Configuração inicial: cache local ligado; o usuário pode ajustar à vontade
+        write_text_if_changed(
+            config,
+            "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+            "<cache xmlns=\"http://maven.apache.org/BUILD-CACHE-CONFIG/1.0.0\"\n"
+            "       xmlns:xsi=\"http://www.w3.org/2001/XMLSchema-instance\"\n"
+            "       xsi:schemaLocation=\"http://maven.apache.org/BUILD-CACHE-CONFIG/1.0.0"
+            " https://maven.apache.org/xsd/build-cache-config-1.0.0.xsd\">\n"
+            "  <configuration>\n"
+            "    <enabled>true</enabled>\n"
+            "    <hashAlgorithm>XX</hashAlgorithm>\n"
+            "  </configuration>\n"
+            "  <input>\n"
+            "    <global>\n"
+            "      <glob>{*.java,*.xml,*.properties,*.yaml,*.yml}</glob>\n"
+            "    </global>\n"
+            "  </input>\n"
+            "</cache>\n",
+        )
+        log(f"[OK] Criado {config}")
 
 
 # ==========================
 # Instalação JDK/Maven
 # ==========================
 
-def select_jdk_dist(java_version: str, os_name: str, arch: str) -> List[JdkDist]:
-    """Build the ordered list of JDK distributions to try for the given combo."""
+@functools.lru_cache(maxsize=None)
+def select_jdk_dist(java_version: str, os_name: str, arch: str) -> Tuple[JdkDist, ...]:
+    """Build the ordered JDK distributions to try for the given combo (memoized, immutable)."""
 
-    # Lista de candidatos: tabela estática + geração dinâmica para versões não mapeadas
-    candidates: List[JdkDist] = []
-    static_list = JDK_URLS.get(java_version, {}).get((os_name, arch))
-    if static_list:
-        candidates.extend(static_list)
+    # Lista de candidatos: tabela de config + geração dinâmica para versões não mapeadas
+    candidates = get_jdk_dists(java_version, os_name, arch)
 
-    # Se não há estático suficiente, gerar candidatos dinamicamente
+    # Se a tabela não cobre a combinação, gerar candidatos dinamicamente
     if not candidates:
         if java_version not in {"8", "11", "17"}:
             try:
@@ -701,9 +1741,10 @@ def select_jdk_dist(java_version: str, os_name: str, arch: str) -> List[JdkDist]
                 candidates.append(factory(java_version, os_name, arch))
             except ValueError:
                 continue
-    return candidates
+    return tuple(candidates)
 
 
+@functools.lru_cache(maxsize=None)
 def _jdk_base(java_version: str) -> Path:
     return JAENVTIX_HOME / f"jdk-{java_version}"
 
@@ -712,120 +1753,163 @@ def locate_existing_jdk(java_version: str) -> Optional[Path]:
     """Check if a JDK is already installed for the given major version."""
 
     jdk_base = _jdk_base(java_version)
-    if not jdk_base.exists():
+    marker = read_install_marker(jdk_base)
+    if marker and isinstance(marker.get("home"), str):
+        home = jdk_base / marker["home"]
+        if (home / "bin").is_dir():
+            return home
+    if (jdk_base / INSTALLING_MARKER).exists():
+        # Extração interrompida: a árvore pode já ter bin/ sem estar completa
+        log(f"[WARN] Instalação incompleta do JDK {java_version} em {jdk_base}; reinstalando.")
         return None
-    for ch in jdk_base.iterdir():
-        if ch.is_dir() and (ch / "bin").exists():
-            return ch
-    return None
+    # Instalações antigas (sem sentinela): varrer as subpastas
+    return _find_extracted_jdk_home(jdk_base, max_depth=1)
 
 
-def download_jdk_package(java_version: str, os_name: str, arch: str) -> Optional[Tuple[Path, JdkDist]]:
-    """Download a JDK archive using the configured preference order."""
+def _remove_entries(entries: List["os.DirEntry[str]"]) -> List[str]:
+    """Delete scandir entries (trees in parallel); return the paths that could not be removed."""
 
-    candidates = select_jdk_dist(java_version, os_name, arch)
-    if not candidates:
-        log(f"[ERRO] Não encontrado JDK para combinação: SO={os_name} arch={arch} java={java_version}")
-        return None
+    def remove(entry: "os.DirEntry[str]") -> Optional[str]:
+        try:
+            # DirEntry traz o tipo da listagem: sem stat extra por entrada
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return entry.path
+        return entry.path if os.path.lexists(entry.path) else None
 
-    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    if len(entries) < 2:
+        failed = [remove(e) for e in entries]
+    else:
+        # Árvores independentes (bin/, lib/, jmods/...): os unlink se sobrepõem entre threads
+        with ThreadPoolExecutor(max_workers=min(MAX_PROVISION_WORKERS, len(entries))) as executor:
+            failed = list(executor.map(remove, entries))
+    return [p for p in failed if p]
 
-    last_err: Optional[Exception] = None
-    for dist in candidates:
-        try:
-            log(f"[INFO] Tentando download do JDK {dist.name} ({os_name}/{arch})")
-            archive = TEMP_DIR / f"jdk-{java_version}-{dist.name}.{dist.ext}"
-            if download_with_retries(dist.url, archive):
-                return archive, dist
-            raise RuntimeError("download_failed")
-        except Exception as exc:  # noqa: PERF203 (explicitar o erro capturado)
-            last_err = exc
-            log(f"[WARN] Falha ao baixar {dist.name}: {exc}. Tentando próximo...")
-    log(
-        f"[ERRO] Falha ao baixar JDK após testar {len(candidates)} distribuidores. Último erro: {last_err}"
-    )
-    return None
+
+# Árvores antigas movidas para TEMP_DIR e apagadas em segundo plano; cleanup_temp as aguarda
+_BACKGROUND_REMOVALS: List[threading.Thread] = []
 
 
 def _cleanup_old_jdk_content(jdk_base: Path) -> None:
-    for child in jdk_base.iterdir():
-        if child.name == "mvn-custom":
-            continue
+    """Clear ``jdk_base`` (except mvn-custom), deleting the old trees off the critical path."""
+
+    with os.scandir(jdk_base) as it:
+        entries = [e for e in it if e.name != "mvn-custom"]
+    if not entries:
+        return
+    # Um rename por entrada libera jdk_base na hora; os milhares de unlink do JDK antigo
+    # correm numa thread enquanto o novo já é baixado e extraído (mesmo disco: ~/.jaenvtix)
+    trash = _ensure_dir(TEMP_DIR) / f"old-{jdk_base.name}-{time.monotonic_ns()}"
+    try:
+        trash.mkdir()
+    except OSError:
+        _remove_entries(entries)
+        return
+    stuck: List["os.DirEntry[str]"] = []
+    for entry in entries:
         try:
-            if child.is_dir():
-                shutil.rmtree(child, ignore_errors=True)
-            else:
-                child.unlink(missing_ok=True)
-        except Exception:
-            pass
+            os.rename(entry.path, trash / entry.name)
+        except OSError:
+            stuck.append(entry)  # ex.: arquivo em uso no Windows; apagar no lugar
+    _remove_entries(stuck)
+    thread = threading.Thread(target=shutil.rmtree, args=(trash,), kwargs={"ignore_errors": True}, daemon=True)
+    thread.start()
+    _BACKGROUND_REMOVALS.append(thread)
 
 
-def install_jdk_from_archive(java_version: str, archive: Path, dist: JdkDist) -> Optional[Path]:
-    """Extract a downloaded JDK archive into the Jaenvtix layout."""
+# Profundidade máxima da busca pelo JDK home (macOS: jdk-<v>.jdk/Contents/Home)
+_JDK_HOME_MAX_DEPTH = 4
 
-    jdk_base = _jdk_base(java_version)
-    jdk_base.mkdir(parents=True, exist_ok=True)
 
-    _cleanup_old_jdk_content(jdk_base)
-    if not extract_archive(archive, jdk_base):
-        log("[ERRO] Falha ao extrair o JDK baixado.")
-        return None
+def _find_extracted_jdk_home(jdk_base: Path, max_depth: int = _JDK_HOME_MAX_DEPTH) -> Optional[Path]:
+    """Return the JDK home (folder with ``bin``) found under ``jdk_base`` after extraction.
 
-    extracted_home: Optional[Path] = None
-    for ch in jdk_base.iterdir():
-        if ch.is_dir() and (ch / "bin").exists():
-            extracted_home = ch
-            break
-    if not extracted_home:
-        subs = [p for p in jdk_base.glob("**/bin") if p.is_dir()]
-        if subs:
-            extracted_home = subs[0].parent
-
-    if extracted_home:
-        log(f"[OK] JDK instalado com {dist.name} em: {extracted_home}")
-        return extracted_home
-
-    log("[ERRO] Estrutura do JDK não encontrada após extração.")
+    The search is breadth-first with :func:`os.scandir`, skips the Maven
+    folder and stops at the first match instead of walking the whole tree.
+    """
+
+    level = [jdk_base.as_posix()]
+    for _ in range(max_depth):
+        deeper: List[str] = []
+        for folder in level:
+            try:
+                with os.scandir(folder) as it:
+                    subdirs = sorted(
+                        e.path for e in it if e.is_dir(follow_symlinks=False) and e.name != "mvn-custom"
+                    )
+            except OSError:
+                continue
+            for sub in subdirs:
+                if os.path.isdir(os.path.join(sub, "bin")):
+                    return Path(sub)
+            deeper.extend(subdirs)
+        level = deeper
+    # Arquivo sem pasta raiz: o próprio jdk_base é o home
+    if (jdk_base / "bin").is_dir():
+        return jdk_base
     return None
 
 
-def install_jdk_with_fallback(
-    java_version: str,
-    os_name: str,
-    arch: str,
-    skip: Optional[Set[JdkDist]] = None,
-) -> Optional[Path]:
-    """Try installing the JDK from alternative distributions when the primary fails."""
+def _rank_jdk_candidates(candidates: Sequence[JdkDist]) -> List[JdkDist]:
+    """Probe all candidates in parallel and move the reachable ones first (order kept otherwise)."""
+
+    if len(candidates) < 2:
+        return list(candidates)
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        reachable = list(executor.map(probe_download_url, [d.url for d in candidates]))
+    healthy = [d for d, ok in zip(candidates, reachable) if ok]
+    # Sondagem negativa não elimina o mirror: ele ainda é tentado, só que por último
+    ranked = healthy + [d for d, ok in zip(candidates, reachable) if not ok]
+    if ranked != list(candidates):
+        log(f"[INFO] Mirrors indisponíveis na sondagem; nova ordem: {', '.join(d.name for d in ranked)}")
+    return ranked
+
+
+def provision_jdk(java_version: str, os_name: str, arch: str) -> Optional[Path]:
+    """Stream-install the JDK, trying each configured distribution in preference order."""
 
     candidates = select_jdk_dist(java_version, os_name, arch)
-    skip_set: Set[JdkDist] = skip or set()
-    remaining = [dist for dist in candidates if dist not in skip_set]
-    if not remaining:
-        log("[ERRO] Nenhum distribuidor adicional de JDK disponível para fallback.")
+    if not candidates:
+        log(f"[ERRO] Não encontrado JDK para combinação: SO={os_name} arch={arch} java={java_version}")
         return None
 
-    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    candidates = _rank_jdk_candidates(candidates)
+    jdk_base = _ensure_dir(_jdk_base(java_version))
 
-    last_err: Optional[Exception] = None
-    for dist in remaining:
-        try:
-            log(f"[INFO] Tentando fallback com JDK {dist.name} ({os_name}/{arch})")
-            archive = TEMP_DIR / f"jdk-{java_version}-{dist.name}.{dist.ext}"
-            if not download_with_retries(dist.url, archive):
-                raise RuntimeError("download_failed")
-            jdk_home = install_jdk_from_archive(java_version, archive, dist)
+    # 1ª passada: uma tentativa rápida por mirror (sem backoff), para trocar logo de um
+    # mirror degradado; só se todos falharem entram as tentativas com backoff.
+    invalid: List[JdkDist] = []
+    for attempts, timeout in ((1, FAST_FAIL_TIMEOUT), (3, DOWNLOAD_TIMEOUT)):
+        for dist in candidates:
+            if dist in invalid:
+                continue
+            log(f"[INFO] Tentando download do JDK {dist.name} ({os_name}/{arch})")
+            _cleanup_old_jdk_content(jdk_base)
+            in_progress = jdk_base / INSTALLING_MARKER
+            in_progress.write_text(dist.url, encoding="utf-8")
+            sha256 = stream_download_and_extract(dist.url, jdk_base, dist.ext, attempts, timeout=timeout)
+            if not sha256:
+                log(f"[WARN] Falha ao baixar/extrair {dist.name}. Tentando próximo candidato...")
+                continue
+            jdk_home = _find_extracted_jdk_home(jdk_base)
             if jdk_home:
+                write_install_marker(
+                    jdk_base, dist.url, sha256, dist=dist.name, home=jdk_home.relative_to(jdk_base).as_posix()
+                )
+                if read_install_marker(jdk_base) is not None:
+                    # Só a sentinela prova a instalação: sem ela a árvore continua marcada
+                    in_progress.unlink()
+                log(f"[OK] JDK instalado com {dist.name} em: {jdk_home}")
                 return jdk_home
-            last_err = RuntimeError("install_failed")
-            log(f"[WARN] Falha ao instalar JDK com {dist.name}. Tentando próximo candidato...")
-        except Exception as exc:  # noqa: PERF203 - precisamos logar o erro concreto
-            last_err = exc
-            log(f"[WARN] Falha ao preparar {dist.name}: {exc}. Tentando próximo candidato...")
-
-    log(
-        "[ERRO] Falha ao instalar JDK após testar "
-        f"{len(remaining)} distribuidores. Último erro: {last_err}"
-    )
+            invalid.append(dist)
+            log(f"[WARN] Estrutura do JDK não encontrada após extrair {dist.name}. Tentando próximo candidato...")
+
+    log(f"[ERRO] Falha ao instalar JDK após testar {len(candidates)} distribuidores.")
     return None
 
 
@@ -844,16 +1928,39 @@ def locate_existing_maven(java_version: str, os_name: str) -> Optional[Tuple[Pat
 def download_maven_package(os_name: str) -> Optional[Tuple[Path, str]]:
     """Download the Maven distribution archive for the current OS."""
 
+    try:
+        return _fetch_maven_package(os_name)
+    except RuntimeError:
+        return None
+
+
+@_single_flight
+def _fetch_maven_package(os_name: str) -> Tuple[Path, str]:
+    """Fetch the Maven archive once per run, however many projects/JDKs need it."""
+
     distro = _resolve_maven_distro(os_name)
     if distro is None:
-        return None
+        raise RuntimeError(f"Maven não suportado para SO {os_name}")
 
     url, ext = distro
-    archive = TEMP_DIR / f"apache-maven-{DEFAULT_MAVEN_VERSION}-bin.{ext}"
-    TEMP_DIR.mkdir(parents=True, exist_ok=True)
-    if _download_maven_distribution(url, archive):
-        return archive, ext
-    return None
+    archive = CACHE_DIR / f"apache-maven-{DEFAULT_MAVEN_VERSION}-bin.{ext}"
+    _ensure_dir(CACHE_DIR)
+    if not _download_maven_distribution(url, archive):
+        raise RuntimeError("Download do Maven falhou")
+    return archive, ext
+
+
+def _move_tree(src: Path, dst: Path) -> None:
+    """Rename ``src`` to ``dst``, copying the tree only across filesystems."""
+
+    # Staging e destino ficam em ~/.jaenvtix: normalmente só um rename, sem copiar a árvore.
+    # Um destino que sobrou (rmtree parcial) falha aqui em vez de receber o staging dentro dele
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(str(src), str(dst))
 
 
 def install_maven_from_archive(
@@ -861,19 +1968,16 @@ def install_maven_from_archive(
 ) -> Optional[Tuple[Path, Path]]:
     """Extract Maven into the mvn-custom folder under the requested JDK version."""
 
-    jdk_base = _jdk_base(java_version)
-    jdk_base.mkdir(parents=True, exist_ok=True)
+    jdk_base = _ensure_dir(_jdk_base(java_version))
 
-    extracted = _extract_maven_archive(archive)
-    if extracted is None:
+    staging = _extract_maven_archive(archive, java_version)
+    if staging is None:
         return None
-    extracted_root, extract_dir = extracted
 
     mvn_custom = jdk_base / "mvn-custom"
     if mvn_custom.exists():
         shutil.rmtree(mvn_custom, ignore_errors=True)
-    shutil.move(str(extracted_root), str(mvn_custom))
-    shutil.rmtree(extract_dir, ignore_errors=True)
+    _move_tree(staging, mvn_custom)
 
     mvn_bin_dir = mvn_custom / "bin"
     mvn_exe = mvn_bin_dir / ("mvn.cmd" if os_name == "windows" else "mvn")
@@ -883,12 +1987,16 @@ def install_maven_from_archive(
         except Exception:
             pass
 
+    distro = _resolve_maven_distro(os_name)
+    url = distro[0] if distro else ""
+    write_install_marker(mvn_custom, url, archive_sha256(url, archive), version=DEFAULT_MAVEN_VERSION)
     log(f"[OK] Maven instalado em: {mvn_custom}")
     return mvn_custom, mvn_exe
 
 
+@functools.lru_cache(maxsize=None)
 def _resolve_maven_distro(os_name: str) -> Optional[Tuple[str, str]]:
-    """Return the (url, extension) tuple for the configured Maven version."""
+    """Return the (url, extension) tuple for the configured Maven version (memoized)."""
 
     url = MAVEN_URLS.get(DEFAULT_MAVEN_VERSION, {}).get(os_name)
     if not url:
@@ -901,29 +2009,173 @@ def _resolve_maven_distro(os_name: str) -> Optional[Tuple[str, str]]:
 def _download_maven_distribution(url: str, archive: Path) -> bool:
     """Download the Maven archive unless a previous valid copy exists."""
 
-    if archive.exists() and archive.stat().st_size > 0:
+    if is_download_complete(url, archive):
         log(f"[INFO] Reutilizando artefato Maven existente: {archive}")
         return True
     return download_with_retries(url, archive)
 
 
-def _extract_maven_archive(archive: Path) -> Optional[Tuple[Path, Path]]:
-    """Extract Maven archive and return its root directory plus the temp folder."""
+@_single_flight
+def _unpack_maven_archive(archive: Path) -> Path:
+    """Extract the Maven archive once per run into a pristine tree shared by every JDK."""
 
     extract_dir = TEMP_DIR / f"maven-extract-{DEFAULT_MAVEN_VERSION}"
     if extract_dir.exists():
         shutil.rmtree(extract_dir, ignore_errors=True)
     extract_dir.mkdir(parents=True, exist_ok=True)
 
-    if not extract_archive(archive, extract_dir):
+    if not extract_archive(archive, extract_dir, strip=1):
+        raise RuntimeError("Extração do Maven falhou")
+    if not (extract_dir / "bin").is_dir():
+        log("[ERRO] Estrutura inesperada após extrair Maven.")
+        raise RuntimeError("Estrutura inesperada do Maven")
+    return extract_dir
+
+
+def _link_tree(src: Path, dst: Path, copied: Tuple[str, ...] = ()) -> None:
+    """Mirror ``src`` into ``dst`` with hard links, copying when linking is impossible.
+
+    Top-level entries named in ``copied`` are always copied, so editing them in
+    one install never leaks into the others.
+    """
+
+    # Caminhos como str no laço: um Path por arquivo só custaria alocação e parsing
+    src_root, dst_root = os.fspath(src), os.fspath(dst)
+    for root, dirs, files in os.walk(src_root):
+        rel = os.path.relpath(root, src_root)
+        top = rel.split(os.sep, 1)[0] if rel != os.curdir else ""
+        target = os.path.join(dst_root, rel) if top else dst_root
+        os.makedirs(target, exist_ok=True)
+        private = top in copied
+        for name in files:
+            s, d = os.path.join(root, name), os.path.join(target, name)
+            if os.path.islink(s):
+                os.symlink(os.readlink(s), d)
+                continue
+            if private or (not top and name in copied):
+                shutil.copy2(s, d)
+                continue
+            try:
+                os.link(s, d)
+            except OSError:
+                # Outro sistema de arquivos (EXDEV) ou FS sem hard links: copiar
+                shutil.copy2(s, d)
+
+
+def _extract_maven_archive(archive: Path, java_version: str) -> Optional[Path]:
+    """Stage Maven for one JDK, hard-linking the tree extracted once for the run."""
+
+    try:
+        pristine = _unpack_maven_archive(archive)
+    except RuntimeError:
+        return None
+    # Pasta por versão de Java: instalações paralelas não disputam o mesmo diretório
+    staging = TEMP_DIR / f"maven-stage-{DEFAULT_MAVEN_VERSION}-jdk{java_version}"
+    if staging.exists():
+        shutil.rmtree(staging, ignore_errors=True)
+    try:
+        # conf/ é copiado: o usuário pode editar settings.xml de um JDK sem afetar os outros
+        _link_tree(pristine, staging, copied=("conf",))
+    except OSError as e:
+        log(f"[ERRO] Falha ao preparar Maven para JDK {java_version}: {e}")
         return None
+    return staging
 
-    for candidate in extract_dir.iterdir():
-        if candidate.is_dir() and candidate.name.startswith("apache-maven-"):
-            return candidate, extract_dir
 
-    log("[ERRO] Estrutura inesperada após extrair Maven.")
-    return None
+@_single_flight
+def ensure_jdk_installed(java_version: str, os_name: str, arch: str) -> Path:
+    """Return the JDK home for the combo, installing it at most once per process.
+
+    Raises :class:`RuntimeError` on failure.
+    """
+
+    existing = locate_existing_jdk(java_version)
+    if existing:
+        log(f"[OK] JDK já presente: {existing}")
+        return existing
+    jdk_home = provision_jdk(java_version, os_name, arch)
+    if not jdk_home:
+        raise RuntimeError("Instalação JDK falhou")
+    return jdk_home
+
+
+@_single_flight
+def ensure_maven_installed(java_version: str, os_name: str) -> Tuple[Path, Path]:
+    """Return ``(maven_home, maven_bin)`` under the JDK folder, installing it at most once.
+
+    Raises :class:`RuntimeError` on failure.
+    """
+
+    existing = locate_existing_maven(java_version, os_name)
+    if existing:
+        log(f"[OK] Maven já presente: {existing[0]}")
+        return existing
+    download = download_maven_package(os_name)
+    if not download:
+        raise RuntimeError("Download do Maven falhou")
+    installed = install_maven_from_archive(java_version, os_name, download[0])
+    if not installed:
+        raise RuntimeError("Instalação do Maven falhou")
+    return installed
+
+
+def _mvnd_exe(mvnd_home: Path, os_name: str) -> Path:
+    return mvnd_home / "bin" / ("mvnd.exe" if os_name == "windows" else "mvnd")
+
+
+def _mvnd_url(os_name: str, arch: str) -> Optional[str]:
+    return MVND_URLS.get(DEFAULT_MVND_VERSION, {}).get(f"{os_name}|{arch}")
+
+
+@_single_flight
+def _fetch_mvnd_package(os_name: str, arch: str) -> Path:
+    """Fetch the mvnd archive for the platform once per run."""
+
+    url = _mvnd_url(os_name, arch)
+    if not url:
+        raise RuntimeError(f"mvnd não disponível para {os_name}/{arch}")
+    ext = "zip" if url.endswith(".zip") else "tar.gz"
+    archive = CACHE_DIR / f"maven-mvnd-{DEFAULT_MVND_VERSION}-{os_name}-{arch}.{ext}"
+    _ensure_dir(CACHE_DIR)
+    if not _download_maven_distribution(url, archive):
+        raise RuntimeError("Download do mvnd falhou")
+    return archive
+
+
+@_single_flight
+def ensure_mvnd_installed(java_version: str, os_name: str, arch: str, jdk_home: Path) -> Path:
+    """Install mvnd under ``mvn-custom/mvnd`` pinned to ``jdk_home``; return its executable.
+
+    Raises :class:`RuntimeError` on failure; callers fall back to plain ``mvn``.
+    """
+
+    mvnd_home = _jdk_base(java_version) / "mvn-custom" / "mvnd"
+    mvnd_exe = _mvnd_exe(mvnd_home, os_name)
+    if mvnd_exe.exists():
+        log(f"[OK] mvnd já presente: {mvnd_home}")
+    else:
+        archive = _fetch_mvnd_package(os_name, arch)
+        staging = TEMP_DIR / f"mvnd-extract-{DEFAULT_MVND_VERSION}-jdk{java_version}"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True, exist_ok=True)
+        if not extract_archive(archive, staging, strip=1) or not _mvnd_exe(staging, os_name).exists():
+            shutil.rmtree(staging, ignore_errors=True)
+            raise RuntimeError("Instalação do mvnd falhou")
+        shutil.rmtree(mvnd_home, ignore_errors=True)
+        _move_tree(staging, mvnd_home)
+        if os_name != "windows":
+            try:
+                mvnd_exe.chmod(0o755)
+            except Exception:
+                pass
+        url = _mvnd_url(os_name, arch) or ""
+        write_install_marker(mvnd_home, url, archive_sha256(url, archive), version=DEFAULT_MVND_VERSION)
+        log(f"[OK] mvnd instalado em: {mvnd_home}")
+
+    # O daemon usa o JDK provisionado mesmo sem JAVA_HOME no ambiente do VS Code
+    (mvnd_home / "conf").mkdir(parents=True, exist_ok=True)
+    write_text_if_changed(mvnd_home / "conf" / "mvnd.properties", f"java.home={jdk_home.as_posix()}\n")
+    return mvnd_exe
 
 
 # ==========================
@@ -968,67 +2220,37 @@ class RuntimeProvisionStep(ValidationStep):
             log("[ERRO] Contexto inválido para provisionamento de runtime.")
             return False
 
-        existing_jdk = locate_existing_jdk(ctx.java_version)
-        if existing_jdk:
-            log(f"[OK] JDK já presente: {existing_jdk}")
-
-        existing_maven = locate_existing_maven(ctx.java_version, ctx.os_name)
-        if existing_maven:
-            log(f"[OK] Maven já presente: {existing_maven[0]}")
-
-        future_jdk: Optional[Future[Optional[Tuple[Path, JdkDist]]]] = None
-        future_maven: Optional[Future[Optional[Tuple[Path, str]]]] = None
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            if not existing_jdk:
-                future_jdk = executor.submit(
-                    download_jdk_package, ctx.java_version, ctx.os_name, ctx.arch
-                )
-            if not existing_maven:
-                future_maven = executor.submit(download_maven_package, ctx.os_name)
-
-        jdk_home: Optional[Path] = existing_jdk
-        jdk_download: Optional[Tuple[Path, JdkDist]] = None
-        if future_jdk is not None:
-            jdk_download = future_jdk.result()
-            if jdk_download is None:
-                log("[ERRO] Download do JDK falhou. Abortando para este projeto.")
-                return False
-
-        if jdk_home is None and jdk_download is not None:
-            archive, dist = jdk_download
-            jdk_home = install_jdk_from_archive(ctx.java_version, archive, dist)
-            if not jdk_home:
-                log("[WARN] Instalação inicial do JDK falhou; tentando distribuidores alternativos.")
-                jdk_home = install_jdk_with_fallback(ctx.java_version, ctx.os_name, ctx.arch, {dist})
-            if not jdk_home:
-                log("[ERRO] Instalação JDK falhou. Abortando para este projeto.")
-                return False
-
-        if jdk_home is None:
-            log("[ERRO] Não foi possível preparar o JDK requerido.")
+        # O download do Maven não depende do JDK: corre numa thread à parte enquanto o JDK
+        # é provisionado nesta. A instalação em jdk-<versão>/mvn-custom só acontece depois
+        # que o JDK foi instalado com sucesso; com o Maven já presente, nenhuma thread extra.
+        try:
+            if locate_existing_maven(ctx.java_version, ctx.os_name) is None:
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    executor.submit(_keep_log_prefix(download_maven_package), ctx.os_name)
+                    jdk_home = ensure_jdk_installed(ctx.java_version, ctx.os_name, ctx.arch)
+            else:
+                jdk_home = ensure_jdk_installed(ctx.java_version, ctx.os_name, ctx.arch)
+        except RuntimeError as e:
+            log(f"[ERRO] {e}. Abortando para este projeto.")
             return False
 
-        maven_home: Optional[Path]
-        maven_bin: Optional[Path]
-        if existing_maven:
-            maven_home, maven_bin = existing_maven
-        else:
-            maven_download: Optional[Tuple[Path, str]] = None
-            if future_maven is not None:
-                maven_download = future_maven.result()
-            if not maven_download:
-                log("[ERRO] Download do Maven falhou. Abortando para este projeto.")
-                return False
-            archive, _ = maven_download
-            maven_result = install_maven_from_archive(ctx.java_version, ctx.os_name, archive)
-            if not maven_result:
-                log("[ERRO] Instalação do Maven falhou. Abortando para este projeto.")
-                return False
-            maven_home, maven_bin = maven_result
+        try:
+            # Arquivo já baixado acima: download_maven_package apenas o reutiliza
+            maven_home, maven_bin = ensure_maven_installed(ctx.java_version, ctx.os_name)
+        except RuntimeError as e:
+            log(f"[ERRO] {e}. Abortando para este projeto.")
+            return False
 
         ctx.jdk_home = jdk_home
         ctx.maven_home = maven_home
         ctx.maven_bin = maven_bin
+
+        if PREFER_MVND:
+            try:
+                ctx.mvnd_bin = ensure_mvnd_installed(ctx.java_version, ctx.os_name, ctx.arch, jdk_home)
+            except (RuntimeError, OSError) as e:
+                # mvnd é opcional: disco cheio, permissão ou rename falho não derrubam o projeto
+                log(f"[WARN] Falha ao preparar o mvnd ({e}); usando o mvn padrão.")
         return True
 
 
@@ -1040,18 +2262,42 @@ class ConfigurationStep(ValidationStep):
             log("[ERRO] Contexto incompleto para configurar ambiente.")
             return False
 
-        try:
-            merge_toolchains(ctx.java_version, ctx.jdk_home)
-        except Exception as e:
-            log(f"[WARN] Falha ao configurar toolchains: {e}")
+        # ~/.m2 é compartilhado (lock entre projetos); .mvn/ e .vscode/ são do projeto.
+        # Arquivos disjuntos: os do projeto são escritos enquanto o ~/.m2 espera o lock
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(_keep_log_prefix(self._configure_m2), ctx.java_version, ctx.jdk_home)
+            return self._configure_project(ctx)
 
-        try:
-            ensure_settings_xml()
-        except Exception as e:
-            log(f"[WARN] Falha ao garantir settings.xml: {e}")
+    @staticmethod
+    def _configure_m2(java_version: str, jdk_home: Path) -> None:
+        with _SHARED_FILES_LOCK:
+            try:
+                merge_toolchains(java_version, jdk_home)
+            except Exception as e:
+                log(f"[WARN] Falha ao configurar toolchains: {e}")
 
+            try:
+                ensure_settings_xml()
+            except Exception as e:
+                log(f"[WARN] Falha ao garantir settings.xml: {e}")
+
+    @staticmethod
+    def _configure_project(ctx: ProjectContext) -> bool:
+        maven_options: Tuple[str, ...] = ()
+        if ENABLE_BUILD_CACHE and (ctx.is_module or (ctx.project_dir.parent / ".mvn").is_dir()):
+            # O Maven só lê o .mvn/ da raiz do reactor: um segundo, no módulo, seria ignorado
+            log(f"[SKIP] {ctx.project_dir.name} é módulo de {ctx.project_dir.parent}; Build Cache fica no .mvn/ do pai")
+            maven_options = BUILD_CACHE_OPTIONS
+        elif ENABLE_BUILD_CACHE:
+            try:
+                ensure_build_cache_extension(ctx.project_dir)
+                maven_options = BUILD_CACHE_OPTIONS
+            except Exception as e:
+                log(f"[WARN] Falha ao configurar o Maven Build Cache: {e}")
+
+        assert ctx.jdk_home is not None and ctx.maven_bin is not None
         try:
-            update_vscode_settings(ctx.project_dir, ctx.jdk_home, ctx.maven_bin)
+            update_vscode_settings(ctx.project_dir, ctx.jdk_home, ctx.mvnd_bin or ctx.maven_bin, maven_options)
         except Exception as e:
             log(f"[WARN] Falha ao atualizar VS Code settings: {e}")
             return False
@@ -1063,44 +2309,82 @@ class ConfigurationStep(ValidationStep):
 # Fluxo principal por projeto
 # ==========================
 
-def process_project(project_dir: Path) -> None:
+# Etapas sem estado (tudo vive no ProjectContext): uma única cadeia serve a todos os projetos
+PROJECT_CHAIN = ValidationChain(
+    [
+        JavaVersionStep(),
+        EnvironmentStep(),
+        RuntimeProvisionStep(),
+        ConfigurationStep(),
+    ]
+)
+
+
+def process_project(project_dir: Path, is_module: bool = False) -> bool:
     """Run the full bootstrap flow for a single Maven project."""
 
     pom = project_dir / "pom.xml"
     if not pom.exists():
         log(f"[SKIP] Sem pom.xml em {project_dir}; nada a fazer.")
-        return
+        return False
 
     log(f"[INFO] Processando projeto: {project_dir}")
-    ctx = ProjectContext(project_dir=project_dir, pom_path=pom)
-    chain = ValidationChain(
-        [
-            JavaVersionStep(),
-            EnvironmentStep(),
-            RuntimeProvisionStep(),
-            ConfigurationStep(),
-        ]
-    )
-
-    if chain.run(ctx):
+    ctx = ProjectContext(project_dir=project_dir, pom_path=pom, is_module=is_module)
+    if PROJECT_CHAIN.run(ctx):
         log(f"[OK] Projeto configurado: {project_dir}")
+        return True
+    return False
+
+
+def provision_all(projects: List[Path], jobs: int = MAX_PROVISION_WORKERS) -> None:
+    """Bootstrap up to ``jobs`` projects at a time; shared runtimes are installed only once."""
+
+    if not projects:
+        return
+
+    listed = set(projects)
+
+    def run(project: Path) -> bool:
+        try:
+            # Subpasta de um projeto da lista (ex.: raiz com pom agregador): tratada como módulo
+            return process_project(project, is_module=project.parent in listed)
+        except Exception as e:
+            log(f"[ERRO] Falha ao processar projeto {project}: {e}")
+            return False
+
+    def run_tagged(project: Path) -> bool:
+        _LOG_CONTEXT.prefix = f"[{project.name}] "
+        try:
+            return run(project)
+        finally:
+            _LOG_CONTEXT.prefix = ""
+
+    workers = max(1, min(jobs, len(projects)))
+    if len(projects) == 1:
+        # Um só projeto: nada a sobrepor, roda na thread principal (logs em ordem natural)
+        configured = int(run(projects[0]))
+    elif workers == 1:
+        # --jobs 1 (rede limitada): um projeto por vez, com o mesmo prefixo nos logs
+        configured = sum(map(run_tagged, projects))
+    else:
+        # Downloads dominam o tempo: projetos em paralelo, JDK/Maven deduplicados por ensure_*
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            configured = sum(executor.map(run_tagged, projects))
+    log(f"[INFO] {configured}/{len(projects)} projeto(s) configurado(s)")
 
 
 def cleanup_temp() -> None:
     """Remove leftover files from ~/.jaenvtix/temp and report failures."""
 
     # 10) Limpeza da pasta temporária
-    leftovers: List[Path] = []
+    leftovers: List[str] = []
+    for thread in _BACKGROUND_REMOVALS:
+        thread.join()
+    _BACKGROUND_REMOVALS.clear()
     try:
         if TEMP_DIR.exists():
-            for ch in TEMP_DIR.iterdir():
-                try:
-                    if ch.is_dir():
-                        shutil.rmtree(ch, ignore_errors=True)
-                    else:
-                        ch.unlink(missing_ok=True)
-                except Exception:
-                    leftovers.append(ch)
+            with os.scandir(TEMP_DIR) as it:
+                leftovers = _remove_entries(list(it))
         if leftovers:
             log("[WARN] Resíduos temporários não removidos:")
             for p in leftovers:
@@ -1111,9 +2395,36 @@ def cleanup_temp() -> None:
         log(f"[WARN] Falha ao limpar temporários: {e}")
 
 
-def main() -> None:
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"esperado um inteiro >= 1, recebido: {value}")
+    return number
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command-line options."""
+
+    parser = argparse.ArgumentParser(
+        description="Provisiona JDK e Maven para os projetos Maven do diretório atual."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        default=MAX_PROVISION_WORKERS,
+        help=f"máximo de projetos processados em paralelo (padrão: {MAX_PROVISION_WORKERS})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
     """Discover Maven projects under the current workspace and bootstrap them."""
 
+    args = parse_args(argv)
     # Determinar diretório raiz do workspace a partir do CWD
     root = Path.cwd()
     log(f"[START] Jaenvtix Setup no workspace: {root}")
@@ -1123,11 +2434,10 @@ def main() -> None:
         log("[INFO] Nenhum pom.xml encontrado no workspace. Nada a fazer.")
         return
 
-    for proj in projects:
-        try:
-            process_project(proj)
-        except Exception as e:
-            log(f"[ERRO] Falha ao processar projeto {proj}: {e}")
+    try:
+        provision_all(projects, args.jobs)
+    except Exception as e:
+        log(f"[ERRO] Falha ao processar projetos: {e}")
 
     # limpeza final
     cleanup_temp()
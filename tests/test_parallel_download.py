@@ -0,0 +1,70 @@
+"""Regression checks for the ranged (parallel) download path."""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Isolar ~/.jaenvtix (state.json) antes de importar o módulo: HOME é lido no import
+_HOME = tempfile.mkdtemp(prefix="jaenvtix-test-home-")
+os.environ["HOME"] = _HOME
+os.environ["USERPROFILE"] = _HOME
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import jaenvtix_setup as js  # noqa: E402
+
+# Maior que os buffers de socket do loopback: um corpo abandonado não chega inteiro ao cliente
+BODY = os.urandom(16 * 1024 * 1024)
+CHUNK = 64 * 1024
+
+
+class _IgnoresRangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serve ``BODY`` with 200 for every GET, ignoring ``Range`` like some proxies do."""
+
+    protocol_version = "HTTP/1.1"
+    sent = 0
+
+    def do_GET(self) -> None:  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        try:
+            for start in range(0, len(BODY), CHUNK):
+                self.wfile.write(BODY[start:start + CHUNK])
+                type(self).sent += CHUNK
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class ParallelDownloadTest(unittest.TestCase):
+    def setUp(self) -> None:
+        _IgnoresRangeHandler.sent = 0
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _IgnoresRangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/archive.zip"
+        self.tmp = Path(tempfile.mkdtemp(prefix="jaenvtix-test-"))
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_range_ignored_probe_reads_no_body(self) -> None:
+        self.assertFalse(js._parallel_download(self.url, self.tmp / "probe.zip", 5))
+        self.assertFalse((self.tmp / "probe.zip").exists())
+
+    def test_range_ignoring_server_transfers_archive_once(self) -> None:
+        dest = self.tmp / "archive.zip"
+        self.assertTrue(js.download_with_retries(self.url, dest, attempts=1, backoff=0, timeout=5))
+        self.assertEqual(dest.read_bytes(), BODY)
+        # Antes da correção a sonda lia o corpo inteiro: o arquivo trafegava duas vezes
+        self.assertLess(_IgnoresRangeHandler.sent, len(BODY) * 3 // 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
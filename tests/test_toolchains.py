@@ -0,0 +1,85 @@
+"""Regression checks for the text-preserving toolchains.xml merge."""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Isolar ~/.jaenvtix (state.json) antes de importar o módulo: HOME é lido no import
+_HOME = tempfile.mkdtemp(prefix="jaenvtix-test-home-")
+os.environ["HOME"] = _HOME
+os.environ["USERPROFILE"] = _HOME
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import jaenvtix_setup as js  # noqa: E402
+
+
+def _toolchain(version: str, configuration: str) -> str:
+    return (
+        "  <toolchain>\n"
+        "    <type>jdk</type>\n"
+        f"    <provides><version>{version}</version></provides>\n"
+        f"    {configuration}\n"
+        "  </toolchain>\n"
+    )
+
+
+class MergeToolchainsFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = Path(tempfile.mkdtemp(prefix="jaenvtix-test-")) / "toolchains.xml"
+
+    def test_declared_latin1_encoding_is_kept(self) -> None:
+        original = (
+            "<?xml version=\"1.0\" encoding=\"ISO-8859-1\"?>\n<toolchains>\n"
+            + _toolchain("11", "<configuration><jdkHome>C:/Users/João/jdk11</jdkHome></configuration>")
+            + "</toolchains>\n"
+        ).encode("iso-8859-1")
+        self.path.write_bytes(original)
+        js._merge_toolchains_file(self.path, "17", "/opt/jdk17")
+        data = self.path.read_bytes()
+        # Entrada existente preservada, ainda em ISO-8859-1 (não substituída pelo template)
+        self.assertIn("C:/Users/João/jdk11".encode("iso-8859-1"), data)
+        self.assertIn(b"<jdkHome>/opt/jdk17</jdkHome>", data)
+        self.assertTrue(data.startswith(original.split(b"</toolchains>")[0]))
+
+    def test_undecodable_file_is_left_alone(self) -> None:
+        original = ("<toolchains>\n" + _toolchain("11", "<configuration/>") + "</toolchains>\n").encode()
+        original = original.replace(b"<type>jdk", b"<type>jdk\xff")
+        self.path.write_bytes(original)
+        with self.assertRaises(RuntimeError):
+            js._merge_toolchains_file(self.path, "17", "/opt/jdk17")
+        self.assertEqual(self.path.read_bytes(), original)
+
+    def test_self_closing_jdk_home_is_filled_in_place(self) -> None:
+        self.path.write_text(
+            "<toolchains>\n" + _toolchain("17", "<configuration><jdkHome/></configuration>") + "</toolchains>\n",
+            encoding="utf-8",
+        )
+        js._merge_toolchains_file(self.path, "17", "/opt/jdk17")
+        text = self.path.read_text(encoding="utf-8")
+        self.assertEqual(text.count("jdkHome"), 2)
+        self.assertIn("<configuration><jdkHome>/opt/jdk17</jdkHome></configuration>", text)
+
+
+class MergeToolchainsMemoTest(unittest.TestCase):
+    def setUp(self) -> None:
+        js._MERGED_TOOLCHAINS.clear()
+        self.path = js.M2_DIR / "toolchains.xml"
+        self.addCleanup(js._MERGED_TOOLCHAINS.clear)
+        self.addCleanup(lambda: self.path.unlink() if self.path.exists() else None)
+
+    def test_failed_merge_is_retried(self) -> None:
+        js.ensure_m2_dirs()
+        self.path.write_bytes(b"<toolchains>\xff</toolchains>\n")
+        with self.assertRaises(RuntimeError):
+            js.merge_toolchains("17", Path("/opt/jdk17"))
+        self.assertEqual(js._MERGED_TOOLCHAINS, {})
+        # Mesmo tamanho do arquivo quebrado: só um mtime diferente salvaria uma memória gravada
+        self.path.write_bytes(b"<toolchains>\x20</toolchains>\n")
+        js.merge_toolchains("17", Path("/opt/jdk17"))
+        self.assertIn("<jdkHome>/opt/jdk17</jdkHome>", self.path.read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()